@@ -1,5 +1,5 @@
 from fastapi import HTTPException, status
-from app.clients.user_client import find_user_by_id, is_user_admin
+from app.clients.user_client import get_cached_user, is_user_admin
 from app.clients.student_client import find_student_by_user_id
 from app.clients.teacher_client import find_teacher_by_user_id
 
@@ -67,7 +67,7 @@ async def require_admin(user_id: str) -> dict:
             detail="Admin authorization required"
         )
     
-    user = await find_user_by_id(user_id)
+    user = await get_cached_user(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse
 from datetime import datetime
+from typing import List, Optional
 from app.api.routes.auth import get_current_user
 from app.schemas.user import UserCreate, UserResponse
-from app.services.user_service import create_user_with_role
+from app.services.user_service import create_user_with_role, create_users_bulk
+from app.clients.user_client import invalidate_user_cache, find_users_by_role
+from app.core.security import PasswordHashingBusy
 from app.schemas.registration_request import (
     RegistrationRequestApprove,
+    RegistrationRequestBulkApprove,
     RegistrationRequestReject,
     RegistrationRequestResponse,
 )
-from app.services import exam_service
+from app.services import analytics_service, exam_service, exam_import, report_export, report_service, rescore_service
+from app.services.scoring import invalidate_answer_key
 import app.db.db as db_module
+from app.core.log import get_logger
+from app.core.responses import MongoJSONResponse, dumps
 from bson import ObjectId
+from pymongo import UpdateOne
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], default_response_class=MongoJSONResponse)
+logger = get_logger(__name__)
 
 
 def _db():
@@ -22,28 +32,102 @@ def _db():
     return db_module.database
 
 
+_USER_LIST_PROJECTION = {"name": 1, "surname": 1, "mobile_phone": 1, "is_active": 1}
+_STUDENT_PROJECTION = {**_USER_LIST_PROJECTION, "email": 1, "grade": 1, "section": 1}
+_TEACHER_PROJECTION = {**_USER_LIST_PROJECTION, "subject": 1}
+
+
+def _student_row(student: dict) -> dict:
+    first_name = student.get('name', '')
+    last_name = student.get('surname', '')
+    return {
+        "id": str(student["_id"]),
+        "name": f"{first_name} {last_name}".strip(),
+        "firstName": first_name,
+        "lastName": last_name,
+        "mobile_phone": student.get("mobile_phone", ""),
+        "mobilePhone": student.get("mobile_phone", ""),
+        "email": student.get("email", f"{first_name.lower()}.{last_name.lower()}@ucaschool.edu" if first_name else "student@ucaschool.edu"),
+        "grade": student.get("grade", "9"),
+        "section": student.get("section", "A"),
+        "is_active": student.get("is_active", True)
+    }
+
+
+def _teacher_row(teacher: dict) -> dict:
+    first_name = teacher.get('name', '')
+    last_name = teacher.get('surname', '')
+    return {
+        "id": str(teacher["_id"]),
+        "name": f"{first_name} {last_name}".strip(),
+        "firstName": first_name,
+        "lastName": last_name,
+        "mobile_phone": teacher.get("mobile_phone", ""),
+        "mobilePhone": teacher.get("mobile_phone", ""),
+        "subject": teacher.get("subject", ""),
+        "is_active": teacher.get("is_active", True)
+    }
+
+
+def _manager_row(manager: dict) -> dict:
+    first_name = manager.get('name', '')
+    last_name = manager.get('surname', '')
+    return {
+        "id": str(manager["_id"]),
+        "name": f"{first_name} {last_name}".strip(),
+        "firstName": first_name,
+        "lastName": last_name,
+        "mobile_phone": manager.get("mobile_phone", ""),
+        "mobilePhone": manager.get("mobile_phone", ""),
+        "is_active": manager.get("is_active", True)
+    }
+
+
+async def _list_users(role: str, projection: dict, to_row, after: Optional[str], limit: Optional[int], search: Optional[str], format: str):
+    """
+    Shared listing for students, teachers and managers.
+    Returns a JSON list (one keyset page when limit is given, with the next cursor in the
+    X-Next-Cursor header) or, with format=ndjson, streams every match one row per line.
+    """
+    _db()
+    after_id = None
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after_id = ObjectId(after)
+
+    if format == "ndjson":
+        cursor = find_users_by_role(role, projection, after=after_id, search=search)
+
+        async def rows():
+            async for user in cursor:
+                yield dumps(to_row(user)) + b"\n"
+
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    cursor = find_users_by_role(role, projection, after=after_id, limit=limit, search=search)
+    users = [to_row(user) async for user in cursor]
+    headers = {}
+    if limit and len(users) == limit:
+        headers["X-Next-Cursor"] = users[-1]["id"]
+    return MongoJSONResponse(users, headers=headers)
+
+
 @router.get("/students")
-async def get_all_students(current_user: dict = Depends(get_current_user)):
-    """Get all registered students for admin/manager view."""
+async def get_all_students(
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    search: Optional[str] = Query(None, min_length=1, max_length=64),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get registered students for admin/manager view.
+    Paginate with limit and the X-Next-Cursor value passed back as after; search matches
+    a name or phone prefix; format=ndjson streams a full export.
+    """
     try:
-        cursor = _db().users.find({"role": "student"})
-        students = []
-        async for student in cursor:
-            first_name = student.get('name', '')
-            last_name = student.get('surname', '')
-            students.append({
-                "id": str(student["_id"]),
-                "name": f"{first_name} {last_name}".strip(),
-                "firstName": first_name,
-                "lastName": last_name,
-                "mobile_phone": student.get("mobile_phone", ""),
-                "mobilePhone": student.get("mobile_phone", ""),
-                "email": student.get("email", f"{first_name.lower()}.{last_name.lower()}@ucaschool.edu" if first_name else "student@ucaschool.edu"),
-                "grade": student.get("grade", "9"),
-                "section": student.get("section", "A"),
-                "is_active": student.get("is_active", True)
-            })
-        return students
+        return await _list_users("student", _STUDENT_PROJECTION, _student_row, after, limit, search, format)
     except HTTPException:
         raise
     except Exception as e:
@@ -51,44 +135,44 @@ async def get_all_students(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/reports")
-async def get_all_reports(current_user: dict = Depends(get_current_user)):
-    """Get all student reports for admin/teacher view, enriched with student and exam info."""
+async def get_all_reports(
+    exam_id: Optional[str] = None,
+    student_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get student reports for admin/teacher view, enriched with student and exam info.
+    Supports filtering by exam, student and creation date range, plus skip/limit pagination.
+    The total number of matching reports is returned in the X-Total-Count header.
+    """
+    query = {}
+    for field, value in (("exam_id", exam_id), ("student_id", student_id)):
+        if value:
+            if not ObjectId.is_valid(value):
+                raise HTTPException(status_code=400, detail=f"Invalid {field}")
+            query[field] = ObjectId(value)
+    if date_from or date_to:
+        query["created_at"] = {}
+        if date_from:
+            query["created_at"]["$gte"] = date_from
+        if date_to:
+            query["created_at"]["$lte"] = date_to
+
     try:
-        cursor = _db().reports.find({})
-        reports = []
-        async for report in cursor:
-            # Serialize IDs
-            report_data = {
-                "id": str(report["_id"]),
-                "student_id": str(report.get("student_id", "")),
-                "exam_id": str(report.get("exam_id", "")),
-                "session_id": str(report.get("session_id", "")),
-                "score": report.get("score", 0),
-                "total": report.get("total", 0),
-                "percentage": report.get("percentage", 0),
-                "created_at": report.get("created_at"),
-            }
-            
-            # Enrich with student info
-            try:
-                student = await _db().users.find_one({"_id": report["student_id"]})
-                if student:
-                    report_data["student_name"] = f"{student.get('name', '')} {student.get('surname', '')}".strip()
-                    report_data["student_phone"] = student.get("mobile_phone", "")
-            except Exception:
-                pass
-            
-            # Enrich with exam info
-            try:
-                exam = await _db().exams.find_one({"_id": report["exam_id"]})
-                if exam:
-                    report_data["exam_title"] = exam.get("title", "Unknown Exam")
-                    report_data["exam_subject"] = exam.get("subject", "")
-            except Exception:
-                pass
-                
-            reports.append(report_data)
-        return reports
+        total = await _db().reports.count_documents(query)
+        cursor = _db().reports.find(query).sort([("created_at", -1), ("_id", -1)]).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        reports = await cursor.to_list(length=None)
+
+        return MongoJSONResponse(
+            await report_service.enrich_reports(reports),
+            headers={"X-Total-Count": str(total)}
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -96,25 +180,16 @@ async def get_all_reports(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/teachers")
-async def get_all_teachers(current_user: dict = Depends(get_current_user)):
-    """Get all registered teachers for admin view."""
+async def get_all_teachers(
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    search: Optional[str] = Query(None, min_length=1, max_length=64),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get registered teachers for admin view. Supports the same pagination, search and export as /students."""
     try:
-        cursor = _db().users.find({"role": "teacher"})
-        teachers = []
-        async for teacher in cursor:
-            first_name = teacher.get('name', '')
-            last_name = teacher.get('surname', '')
-            teachers.append({
-                "id": str(teacher["_id"]),
-                "name": f"{first_name} {last_name}".strip(),
-                "firstName": first_name,
-                "lastName": last_name,
-                "mobile_phone": teacher.get("mobile_phone", ""),
-                "mobilePhone": teacher.get("mobile_phone", ""),
-                "subject": teacher.get("subject", ""),
-                "is_active": teacher.get("is_active", True)
-            })
-        return teachers
+        return await _list_users("teacher", _TEACHER_PROJECTION, _teacher_row, after, limit, search, format)
     except HTTPException:
         raise
     except Exception as e:
@@ -122,62 +197,115 @@ async def get_all_teachers(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/managers")
-async def get_all_managers(current_user: dict = Depends(get_current_user)):
-    """Get all registered managers."""
+async def get_all_managers(
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    search: Optional[str] = Query(None, min_length=1, max_length=64),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get registered managers. Supports the same pagination, search and export as /students."""
     # Only admins can see the list of managers
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view managers")
         
     try:
-        cursor = _db().users.find({"role": "manager"})
-        managers = []
-        async for manager in cursor:
-            first_name = manager.get('name', '')
-            last_name = manager.get('surname', '')
-            managers.append({
-                "id": str(manager["_id"]),
-                "name": f"{first_name} {last_name}".strip(),
-                "firstName": first_name,
-                "lastName": last_name,
-                "mobile_phone": manager.get("mobile_phone", ""),
-                "mobilePhone": manager.get("mobile_phone", ""),
-                "is_active": manager.get("is_active", True)
-            })
-        return managers
+        return await _list_users("manager", _USER_LIST_PROJECTION, _manager_row, after, limit, search, format)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+REGISTRATION_STATUSES = ("pending", "approved", "rejected")
+_REGISTRATION_PROJECTION = {
+    "mobile_phone": 1, "name": 1, "surname": 1, "school": 1, "emergency_contact": 1, "email": 1,
+    "role": 1, "subject": 1, "status": 1, "created_at": 1, "reviewed_at": 1, "review_note": 1,
+}
+
+
+def _registration_row(req: dict) -> dict:
+    """Same fields and order as RegistrationRequestResponse, without per-row model validation."""
+    return {
+        "id": str(req["_id"]),
+        "mobile_phone": req.get("mobile_phone", ""),
+        "mobilePhone": req.get("mobile_phone", ""),
+        "name": req.get("name", ""),
+        "surname": req.get("surname", ""),
+        "firstName": req.get("name", ""),
+        "lastName": req.get("surname", ""),
+        "school": req.get("school"),
+        "emergency_contact": req.get("emergency_contact"),
+        "email": req.get("email"),
+        "role": req.get("role", ""),
+        "subject": req.get("subject"),
+        "status": req.get("status", "pending"),
+        "created_at": req.get("created_at"),
+        "reviewed_at": req.get("reviewed_at"),
+        "review_note": req.get("review_note"),
+    }
+
+
+def _registration_cursor(req: dict) -> str:
+    return f"{req['created_at'].isoformat()}_{req['_id']}"
+
+
+def _parse_registration_cursor(cursor: str) -> dict:
+    """Filter for the rows after a (created_at, _id) cursor in newest-first order."""
+    try:
+        created_at, request_id = cursor.rsplit("_", 1)
+        created_at = datetime.fromisoformat(created_at)
+        request_id = ObjectId(request_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": request_id}},
+    ]}
+
+
 @router.get("/registration-requests", response_model=list[RegistrationRequestResponse])
-async def get_registration_requests(current_user: dict = Depends(get_current_user)):
-    """Get pending registration requests for admin review."""
+async def get_registration_requests(
+    status_filter: Optional[str] = Query(None, alias="status", pattern="^(pending|approved|rejected)$"),
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get registration requests for admin review, newest first, optionally filtered by status.
+    With limit, one keyset page is returned and the cursor for the next page is in X-Next-Cursor.
+    """
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view registration requests")
 
-    requests = []
-    cursor = _db().registration_requests.find({}).sort("created_at", -1)
-    async for req in cursor:
-        requests.append(
-            RegistrationRequestResponse(
-                id=str(req["_id"]),
-                mobile_phone=req.get("mobile_phone", ""),
-                mobilePhone=req.get("mobile_phone", ""),
-                name=req.get("name", ""),
-                surname=req.get("surname", ""),
-                firstName=req.get("name", ""),
-                lastName=req.get("surname", ""),
-                        school=req.get("school"),
-                        emergency_contact=req.get("emergency_contact"),
-                        email=req.get("email"),
-                role=req.get("role", ""),
-                subject=req.get("subject"),
-                status=req.get("status", "pending"),
-                created_at=req.get("created_at"),
-                reviewed_at=req.get("reviewed_at"),
-                review_note=req.get("review_note"),
-            )
-        )
-    return requests
+    query = {}
+    if status_filter:
+        query["status"] = status_filter
+    if after:
+        query.update(_parse_registration_cursor(after))
+
+    cursor = _db().registration_requests.find(query, _REGISTRATION_PROJECTION).sort([("created_at", -1), ("_id", -1)])
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = await cursor.to_list(length=None)
+
+    headers = {}
+    if limit and len(docs) == limit and docs[-1].get("created_at"):
+        headers["X-Next-Cursor"] = _registration_cursor(docs[-1])
+    return MongoJSONResponse([_registration_row(req) for req in docs], headers=headers)
+
+
+@router.get("/registration-requests/counts")
+async def get_registration_request_counts(current_user: dict = Depends(get_current_user)):
+    """Number of registration requests per status, counted on the (status, created_at) index."""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view registration requests")
+
+    counts = {}
+    for request_status in REGISTRATION_STATUSES:
+        counts[request_status] = await _db().registration_requests.count_documents({"status": request_status})
+    counts["total"] = sum(counts.values())
+    return counts
 
 
 @router.post("/registration-requests/{request_id}/approve", status_code=status.HTTP_200_OK)
@@ -218,12 +346,107 @@ async def approve_registration_request(
             },
         )
         return {"message": "Request approved and user created", "user": created}
+    except PasswordHashingBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to approve request: {str(exc)}")
 
 
+@router.post("/registration-requests/bulk-approve", status_code=status.HTTP_200_OK)
+async def bulk_approve_registration_requests(
+    payload: RegistrationRequestBulkApprove,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Approve many pending registration requests at once, creating their users with the given password.
+    Returns one result per request id; failures do not stop the rest of the batch.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can approve registration requests")
+
+    request_ids = list(dict.fromkeys(payload.request_ids))
+    results = {request_id: {"request_id": request_id, "status": "failed"} for request_id in request_ids}
+    valid_ids = []
+    for request_id in request_ids:
+        if ObjectId.is_valid(request_id):
+            valid_ids.append(ObjectId(request_id))
+        else:
+            results[request_id]["error"] = "Invalid request id"
+
+    try:
+        request_docs = {
+            str(doc["_id"]): doc
+            async for doc in _db().registration_requests.find({"_id": {"$in": valid_ids}})
+        }
+        to_approve = []
+        for request_id in request_ids:
+            if "error" in results[request_id]:
+                continue
+            doc = request_docs.get(request_id)
+            if not doc:
+                results[request_id]["error"] = "Registration request not found"
+            elif doc.get("status") != "pending":
+                results[request_id]["error"] = "Request is already reviewed"
+            else:
+                to_approve.append(doc)
+
+        created = await create_users_bulk([
+            {
+                "mobile_phone": doc.get("mobile_phone", ""),
+                "name": doc.get("name", ""),
+                "surname": doc.get("surname", ""),
+                "password": payload.password,
+                "role": doc.get("role", ""),
+                "subject": doc.get("subject"),
+            }
+            for doc in to_approve
+        ])
+
+        now = datetime.utcnow()
+        updates = []
+        for doc, outcome in zip(to_approve, created):
+            result = results[str(doc["_id"])]
+            if "error" in outcome:
+                result["error"] = outcome["error"]
+                continue
+            result["status"] = "approved"
+            result["user"] = outcome["user"]
+            updates.append(UpdateOne(
+                {"_id": doc["_id"], "status": "pending"},
+                {"$set": {
+                    "status": "approved",
+                    "reviewed_at": now,
+                    "review_note": "Approved by admin",
+                    "created_user_id": outcome["user"]["id"],
+                }},
+            ))
+        if updates:
+            await _db().registration_requests.bulk_write(updates, ordered=False)
+    except PasswordHashingBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        )
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to approve requests: {str(exc)}")
+
+    approved = sum(1 for result in results.values() if result["status"] == "approved")
+    return {
+        "approved": approved,
+        "failed": len(results) - approved,
+        "results": list(results.values()),
+    }
+
+
 @router.post("/registration-requests/{request_id}/reject", status_code=status.HTTP_200_OK)
 async def reject_registration_request(
     request_id: str,
@@ -276,6 +499,7 @@ async def delete_user_permanently(
             await _db().teachers.delete_many({"user_id": {"$in": [stored_user_id, user_id]}})
 
         await _db().users.delete_one({"_id": stored_user_id})
+        invalidate_user_cache(stored_user_id)
         return {"message": "User deleted permanently", "id": user_id, "role": role}
     except HTTPException:
         raise
@@ -314,6 +538,7 @@ async def create_exam(
         except Exception:
             end_at = now + timedelta(days=7)
         
+        assigned_students = data.get("assigned_students", []) # List of mobile phones
         exam_doc = {
             "title": data.get("title", "Untitled Exam"),
             "subject": data.get("subject", "General"),
@@ -322,8 +547,10 @@ async def create_exam(
             "end_at": end_at,
             "is_active": data.get("is_active", True),
             "questions": [],
-            "assigned_students": data.get("assigned_students", []), # List of mobile phones
-            "creator_id": current_user.get("_id")
+            "assigned_students": assigned_students,
+            "assigned_students_normalized": exam_service.normalize_assignments(assigned_students),
+            "creator_id": current_user.get("_id"),
+            "submission_count": 0
         }
         
         # Insert exam
@@ -364,10 +591,36 @@ async def create_exam(
             q_result = await _db().questions.insert_many(questions_to_insert)
             q_ids = list(q_result.inserted_ids)
             await _db().exams.update_one({"_id": exam_id}, {"$set": {"questions": q_ids}})
+        exam_service.invalidate_question_cache(exam_id)
+        invalidate_answer_key(exam_id)
             
         return {"id": str(exam_id), "message": "Exam created successfully"}
     except Exception as e:
-        print(f"Error creating exam: {e}")
+        logger.exception("Error creating exam")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/exams/import", status_code=status.HTTP_201_CREATED)
+async def import_exams(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(jsonl|csv)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import exams and questions from a JSON-lines or CSV upload (one question per row).
+    The format defaults to the file extension. Invalid rows are skipped and reported.
+    """
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Only admins and teachers can import exams")
+    _db()
+
+    fmt = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "jsonl")
+    try:
+        return await exam_import.import_exams(exam_import.aiter_rows(file.file, fmt), current_user.get("_id"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error importing exams")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -375,7 +628,7 @@ async def create_exam(
 async def get_all_exams(current_user: dict = Depends(get_current_user)):
     """Get all exams for admin/teacher view."""
     try:
-        return await exam_service.get_all_exams()
+        return MongoJSONResponse(await exam_service.get_all_exams())
     except HTTPException:
         raise
     except Exception as e:
@@ -396,7 +649,10 @@ async def update_exam_assignments(
     try:
         result = await _db().exams.update_one(
             {"_id": ObjectId(exam_id)},
-            {"$set": {"assigned_students": assigned_students}}
+            {"$set": {
+                "assigned_students": assigned_students,
+                "assigned_students_normalized": exam_service.normalize_assignments(assigned_students)
+            }}
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Exam not found")
@@ -405,6 +661,112 @@ async def update_exam_assignments(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/exams/{exam_id}/analytics")
+async def get_exam_analytics(
+    exam_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Score distribution, per-question correct rate, option distribution and discrimination of an exam."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not ObjectId.is_valid(exam_id):
+        raise HTTPException(status_code=400, detail="Invalid exam id")
+
+    try:
+        return await analytics_service.get_exam_analytics(exam_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to load exam analytics: {str(exc)}")
+
+
+@router.post("/exams/{exam_id}/rescore", status_code=status.HTTP_202_ACCEPTED)
+async def rescore_exam(
+    exam_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Re-score every completed session of an exam in the background (e.g. after an answer key fix)."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not ObjectId.is_valid(exam_id):
+        raise HTTPException(status_code=400, detail="Invalid exam id")
+
+    try:
+        return await rescore_service.start_rescore_job(exam_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to start re-scoring: {str(exc)}")
+
+
+@router.get("/rescore-jobs/{job_id}")
+async def get_rescore_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get progress and throughput of a re-scoring job."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    job = rescore_service.get_rescore_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Re-scoring job not found")
+    return job
+
+
+@router.post("/exams/{exam_id}/report-export", status_code=status.HTTP_202_ACCEPTED)
+async def export_exam_reports(
+    exam_id: str,
+    student_id: Optional[List[str]] = Query(None, description="Only export these students"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Render the report PDFs of every completed session of an exam into one ZIP, in the background."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not ObjectId.is_valid(exam_id) or not all(ObjectId.is_valid(sid) for sid in student_id or []):
+        raise HTTPException(status_code=400, detail="Invalid exam or student id")
+
+    try:
+        return await report_export.start_export_job(exam_id, student_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to start report export: {str(exc)}")
+
+
+@router.get("/report-exports/{job_id}")
+async def get_report_export(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get progress of a report export job."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    job = report_export.get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report export not found")
+    return job
+
+
+@router.get("/report-exports/{job_id}/download")
+async def download_report_export(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Download the ZIP of a completed report export."""
+    if current_user.get("role") not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    try:
+        export = report_export.get_export_file(job_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if not export:
+        raise HTTPException(status_code=404, detail="Report export not found")
+    return FileResponse(export["path"], media_type="application/zip", filename=export["filename"])
+
+
 @router.post("/users/create", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user_admin(
     user_data: UserCreate,
@@ -433,6 +795,12 @@ async def create_user_admin(
             subject=user_data.subject
         )
         return UserResponse(**result)
+    except PasswordHashingBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from app.schemas.auth import UserLogin, Token
-from app.core.security import decode_access_token
-from app.clients.user_client import find_user_by_id
+from app.core.security import decode_access_token, PasswordHashingBusy
+from app.clients.user_client import get_cached_user
 from app.services.auth_service import authenticate_user
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -28,7 +28,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await find_user_by_id(user_id)
+    user = await get_cached_user(user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,6 +55,12 @@ async def login(user_data: UserLogin):
     try:
         result = await authenticate_user(user_data.mobile_phone, user_data.password)
         return Token(**result)
+    except PasswordHashingBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        )
     except ValueError as exc:
         error_msg = str(exc)
         if "incorrect" in error_msg.lower() or "password" in error_msg.lower():
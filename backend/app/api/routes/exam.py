@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from typing import List
 from app.services import exam_service
 from pydantic import BaseModel
 from app.api.routes.auth import get_current_user
+from app.core.responses import MongoJSONResponse
 
-router = APIRouter(prefix="/api/exams", tags=["exams"])
+router = APIRouter(prefix="/api/exams", tags=["exams"], default_response_class=MongoJSONResponse)
 
 class AnswerSubmission(BaseModel):
     session_token: str
@@ -20,10 +21,10 @@ async def list_active_exams(current_user: dict = Depends(get_current_user)):
     """List all exams currently available for the logged-in student."""
     try:
         # Use mobile phone for assignment check as it's the primary identifier
-        return await exam_service.get_active_exams(
+        return MongoJSONResponse(await exam_service.get_active_exams(
             student_mobile=current_user.get("mobile_phone"),
             student_id=str(current_user.get("_id"))
-        )
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -33,21 +34,27 @@ async def get_exam_details(exam_id: str):
     exam = await exam_service.get_exam_by_id(exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
-    return exam
+    return MongoJSONResponse(exam)
 
 @router.get("/{exam_id}/questions")
-async def get_exam_questions(exam_id: str):
-    """Get all questions for an exam (without answers)."""
+async def get_exam_questions(exam_id: str, request: Request):
+    """Get all questions for an exam (without answers). Supports If-None-Match revalidation."""
     try:
-        return await exam_service.get_questions_for_exam(exam_id)
+        body, etag = await exam_service.get_questions_payload(exam_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.post("/start-session")
 async def start_session(data: SessionStart):
     """Start or resume an exam session."""
     try:
-        return await exam_service.start_exam_session(data.student_id, data.exam_id)
+        return MongoJSONResponse(await exam_service.start_exam_session(data.student_id, data.exam_id))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
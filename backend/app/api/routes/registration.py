@@ -6,7 +6,7 @@ from app.clients.user_client import find_user_by_mobile_phone
 from app.schemas.registration_request import RegistrationRequestCreate, RegistrationRequestResponse
 from app.schemas.user import UserCreate, UserResponse
 from app.services.user_service import self_register_user
-from app.core.security import create_access_token
+from app.core.security import create_access_token, PasswordHashingBusy
 
 router = APIRouter(prefix="/api/register", tags=["registration"])
 
@@ -109,6 +109,12 @@ async def register_user_endpoint(user_data: UserCreate):
         result["access_token"] = access_token
 
         return result
+    except PasswordHashingBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        )
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,58 +1,51 @@
-from fastapi import APIRouter, HTTPException
-from app.services import report_service
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from app.services import report_service, pdf_service
 import app.db.db as db
-from bson import ObjectId
+from app.core.responses import MongoJSONResponse
+
+router = APIRouter(prefix="/api/reports", tags=["reports"], default_response_class=MongoJSONResponse)
+
+
+class _CachedPdfResponse(FileResponse):
+    """Sends a cached PDF and releases it for eviction afterwards, even if the client went away."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            pdf_service.release_pdf(self.path)
 
-router = APIRouter(prefix="/api/reports", tags=["reports"])
 
 @router.get("/session/{session_token_or_id}")
 async def get_report(session_token_or_id: str):
     """Get the report for a specific exam session (by session token or ObjectId)."""
-    database = db.database
-    if database is None:
+    if db.database is None:
         raise HTTPException(status_code=503, detail="Database not connected")
     try:
-        # Step 1: Try to find the session - first by token (UUID string), then by ObjectId
-        session = await database.exam_sessions.find_one({"session_token": session_token_or_id})
-        if not session:
-            # Try by ObjectId
-            try:
-                session = await database.exam_sessions.find_one({"_id": ObjectId(session_token_or_id)})
-            except Exception:
-                pass
-        
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        session_id = str(session["_id"])
-        
-        # Step 2: Get or calculate the report
-        report = await report_service.get_report_by_session(session_id)
-        if not report:
-            report = await report_service.calculate_score(session_id)
-        
-        # Serialize ObjectIds
-        for key in ["_id", "student_id", "exam_id", "session_id"]:
-            if key in report and not isinstance(report[key], str):
-                report[key] = str(report[key])
-        
-        return report
-    except HTTPException:
-        raise
+        report = await report_service.get_session_report(session_token_or_id)
+        # ObjectIds are encoded as strings by the response class
+        return MongoJSONResponse(report)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 @router.get("/session/{session_id}/pdf")
-async def export_report_pdf(session_id: str):
-    """Export the report as a server-side generated PDF."""
+async def export_report_pdf(session_id: str, request: Request):
+    """
+    Export the report as a server-side generated PDF.
+    PDFs are rendered once per report version and revalidated with ETag/If-None-Match.
+    """
     try:
-        from fastapi.responses import StreamingResponse
-        pdf_buffer = await report_service.generate_pdf_report(session_id)
-        return StreamingResponse(
-            pdf_buffer,
+        path, etag = await pdf_service.get_report_pdf(session_id, request.headers.get("if-none-match"))
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if path is None:
+            return Response(status_code=304, headers=headers)
+        return _CachedPdfResponse(
+            path,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=Report_{session_id}.pdf"}
+            filename=f"Report_{session_id}.pdf",
+            headers=headers
         )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
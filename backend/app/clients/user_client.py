@@ -1,6 +1,13 @@
+import re
 from typing import Optional
 from bson import ObjectId
 from app.db import db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.request_scope import request_memo
+
+# user_id -> user document of recently authenticated principals
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
 
 
 async def find_user_by_mobile_phone(mobile_phone: str) -> Optional[dict]:
@@ -19,6 +26,78 @@ async def find_user_by_id(user_id: str) -> Optional[dict]:
     return await db.database.users.find_one({"_id": ObjectId(user_id)})
 
 
+def find_users_by_role(
+    role: str,
+    projection: dict,
+    after: Optional[ObjectId] = None,
+    limit: Optional[int] = None,
+    search: Optional[str] = None,
+    batch_size: int = 1000
+):
+    """
+    Cursor over users of a role in _id order, for keyset pagination.
+    `after` is the last _id of the previous page; `search` matches a name, surname
+    or phone prefix (anchored, so the (role, field) indexes can be used).
+    """
+    if db.database is None:
+        raise ValueError("Database not initialized")
+    query = {"role": role}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    if search:
+        query["$or"] = _prefix_filters(search)
+    cursor = db.database.users.find(query, projection, batch_size=batch_size).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+def _prefix_filters(search: str) -> list:
+    search = search.strip()
+    name_prefixes = {search, search[:1].upper() + search[1:]}
+    phone_prefixes = {search}
+    if search[:1].isdigit():
+        # Phones are stored with the leading "+"
+        phone_prefixes.add("+" + search)
+    filters = []
+    for field in ("name", "surname"):
+        filters.extend({field: {"$regex": "^" + re.escape(p)}} for p in name_prefixes)
+    filters.extend({"mobile_phone": {"$regex": "^" + re.escape(p)}} for p in phone_prefixes)
+    return filters
+
+
+async def get_cached_user(user_id: str) -> Optional[dict]:
+    """
+    Find user by ID through the request memo and the short-TTL principal cache.
+    Use for authentication and authorization checks; writes must call invalidate_user_cache.
+    """
+    memo = request_memo()
+    key = ("user", user_id)
+    if memo is not None and key in memo:
+        return memo[key]
+
+    user = _user_cache.get(user_id)
+    if user is not None:
+        user = dict(user)
+    else:
+        user = await find_user_by_id(user_id)
+        if user is not None:
+            _user_cache.set(user_id, dict(user))
+
+    if memo is not None:
+        memo[key] = user
+    return user
+
+
+def invalidate_user_cache(user_id) -> None:
+    """Forget a cached user after it was updated, deactivated or deleted."""
+    user_id = str(user_id)
+    _user_cache.pop(user_id)
+    memo = request_memo()
+    if memo is not None:
+        memo.pop(("user", user_id), None)
+
+
 async def create_user(user_doc: dict) -> str:
     """Create a new user. Returns user_id as string."""
     if db.database is None:
@@ -29,7 +108,7 @@ async def create_user(user_doc: dict) -> str:
 
 async def is_user_admin(user_id: str) -> bool:
     """Check if user is admin."""
-    user = await find_user_by_id(user_id)
+    user = await get_cached_user(user_id)
     if not user:
         return False
     return user.get("role") == "admin"
@@ -45,4 +124,5 @@ async def update_user(user_id: str, update_data: dict) -> bool:
         {"_id": ObjectId(user_id)},
         {"$set": update_data}
     )
+    invalidate_user_cache(user_id)
     return result.modified_count > 0
@@ -16,7 +16,58 @@ class Settings(BaseSettings):
     ADMIN_NAME: str = "Admin"
     ADMIN_SURNAME: str = "User"
     ADMIN_PASSWORD: str = "admin"  # TODO: Change in production
+    QUESTION_CACHE_SIZE: int = 256  # Number of exams whose question sets are kept in memory
+    QUESTION_CACHE_TTL_SECONDS: int = 300
+    ANSWER_KEY_CACHE_SIZE: int = 256  # Compiled exam answer keys kept for scoring
+    ANSWER_KEY_CACHE_TTL_SECONDS: int = 600
+    USER_CACHE_SIZE: int = 10000  # Authenticated users kept in memory by get_current_user
+    USER_CACHE_TTL_SECONDS: int = 30
+    REPORT_CACHE_SIZE: int = 10000  # Reports of completed sessions kept in memory
+    REPORT_CACHE_TTL_SECONDS: int = 300
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost factor for new hashes
+    PASSWORD_HASH_WORKERS: int = 4  # Threads dedicated to bcrypt hashing/verification
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Queued + running operations before requests get 429
+    ANSWER_FLUSH_INTERVAL_SECONDS: float = 1.0  # How often buffered answers are written to MongoDB
+    ACTIVE_SESSION_TABLE_SIZE: int = 100000  # Active exam sessions indexed in memory by token
+    ANSWER_JOURNAL_FSYNC: bool = False  # fsync the answer journal on every answer (survives power loss)
+    MOCK_DB_MMAP: bool = False  # Read the mock database snapshot through mmap on restore
+    MONGO_CONNECT_DEADLINE_SECONDS: float = 20.0  # Give up on MongoDB (and fall back to mock) after this long
+    MONGO_CONNECT_INITIAL_BACKOFF_SECONDS: float = 0.25  # First retry delay, doubled after every failed attempt
+    MONGO_CONNECT_MAX_BACKOFF_SECONDS: float = 4.0
+    DB_CONNECT_IN_BACKGROUND: bool = False  # Start serving at once; other routes answer 503 until the database is ready
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 0  # 0 keeps idle connections open indefinitely
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 0  # 0 waits for a free connection without a limit
+    MONGO_COMPRESSORS: str = ""  # Comma separated, e.g. "zstd,snappy" (needs zstandard / python-snappy)
+    MONGO_READ_PREFERENCE: str = "primary"  # e.g. "primaryPreferred", "secondaryPreferred"
+    MONGO_SLOW_QUERY_MS: int = 200  # Log MongoDB commands slower than this; 0 disables
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_DEBUG_MODULES: str = ""  # Comma separated loggers to run at DEBUG, e.g. "app.services.exam_service"
+    LOG_ANSWER_SAMPLE_RATE: float = 0.01  # Fraction of answer submissions logged at DEBUG
+    PDF_WORKERS: int = 2  # Worker processes rendering report PDFs
+    PDF_CACHE_DIR: str = ""  # Rendered report PDFs; defaults to app/db/pdf_cache
+    PDF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    REPORT_EXPORT_DIR: str = ""  # Bulk report ZIP exports; defaults to app/db/report_exports
     
+    @property
+    def mongo_client_options(self) -> dict:
+        """Keyword arguments for the Motor client built from the pool settings."""
+        options = {
+            "maxPoolSize": self.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": self.MONGO_MIN_POOL_SIZE,
+            "readPreference": self.MONGO_READ_PREFERENCE,
+        }
+        if self.MONGO_MAX_IDLE_TIME_MS:
+            options["maxIdleTimeMS"] = self.MONGO_MAX_IDLE_TIME_MS
+        if self.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+            options["waitQueueTimeoutMS"] = self.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        compressors = [c.strip() for c in self.MONGO_COMPRESSORS.split(",") if c.strip()]
+        if compressors:
+            options["compressors"] = compressors
+        return options
+
     @property
     def MONGODB_URI(self) -> str:
         # Use no-auth URI when credentials are not provided (local dev)
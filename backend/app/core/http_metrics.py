@@ -0,0 +1,113 @@
+"""HTTP request metrics, event-loop lag and per-request DB call counts."""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Optional
+from app.core.metrics import Counter, Gauge, Histogram
+
+# Label used for requests that did not match any route, so unknown paths cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+)
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+http_request_db_calls = Histogram(
+    "http_request_db_calls",
+    "MongoDB commands issued while handling one request.",
+    ("method", "route"),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when a periodic loop callback was due and when it ran.",
+)
+event_loop_lag_last = Gauge(
+    "event_loop_lag_last_seconds",
+    "Most recent event-loop lag sample.",
+)
+
+# Per-request DB command counter; Motor copies the context into its worker threads
+_db_calls: ContextVar[Optional[list]] = ContextVar("db_calls", default=None)
+
+
+def count_db_call() -> None:
+    """Count one database command against the current request, if any."""
+    calls = _db_calls.get()
+    if calls is not None:
+        calls[0] += 1
+
+
+def _route_template(scope) -> str:
+    """Path template of the route that handled the request, e.g. /api/exams/{exam_id}/questions."""
+    app = scope.get("app")
+    endpoint = scope.get("endpoint")
+    if app is None or endpoint is None:
+        return UNMATCHED_ROUTE
+    templates = getattr(app.state, "route_templates", None)
+    if templates is None:
+        templates = {}
+        for route in app.routes:
+            route_endpoint = getattr(route, "endpoint", None)
+            if route_endpoint is not None:
+                templates.setdefault(route_endpoint, route.path)
+        app.state.route_templates = templates
+    return templates.get(endpoint, UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording count, latency, in-flight and DB calls per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        calls = [0]
+        token = _db_calls.set(calls)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _db_calls.reset(token)
+            # The router records the matched endpoint in the scope
+            route = _route_template(scope)
+            method = scope["method"]
+            code = str(status["code"])
+            http_requests_total.inc(method=method, route=route, status=code)
+            http_request_seconds.observe(elapsed, method=method, route=route, status=code)
+            http_request_db_calls.observe(calls[0], method=method, route=route)
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """Sample event-loop lag by measuring how late a fixed sleep wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        event_loop_lag_seconds.observe(lag)
+        event_loop_lag_last.set(lag)
@@ -0,0 +1,100 @@
+"""Structured, non-blocking logging.
+
+Loggers are plain stdlib loggers under the "app" namespace. Records are put on
+a queue by the calling coroutine and formatted and written to stdout by a
+background thread, so logging never blocks the event loop on I/O.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a queue read in the same process.
+    The stock prepare() formats the record and folds the traceback into msg so
+    it can be pickled; here the record stays in memory, so exc_info is kept for
+    the formatter of the writer thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Arguments may be mutated by the caller before the writer thread gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module; pass __name__."""
+    return logging.getLogger(name)
+
+
+def sampled(rate: float) -> bool:
+    """True for roughly `rate` of calls; guards logging of high-frequency events."""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def setup_logging() -> None:
+    """Route the "app" loggers through a queue to a single stdout writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [_LocalQueueHandler(log_queue)]
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.propagate = False
+
+    # Debug output is off by default and enabled per module, e.g. "app.services.exam_service"
+    for name in settings.LOG_DEBUG_MODULES.split(","):
+        if name.strip():
+            logging.getLogger(name.strip()).setLevel(logging.DEBUG)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Drain the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
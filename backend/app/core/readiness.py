@@ -0,0 +1,30 @@
+import app.db.db as db
+
+# Paths served while the database is still connecting or restoring
+READINESS_EXEMPT_PATHS = ("/health", "/metrics")
+
+
+class ReadinessMiddleware:
+    """
+    Pure ASGI middleware answering 503 until the database is ready, so no route
+    runs against a database that is still restoring, indexing or seeding.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or db._ready.is_set() or scope["path"] in READINESS_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        body = b'{"detail":"Database not ready"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+from typing import Optional
+
+# Per-request memo dict, shared by everything that runs while handling one request
+_request_memo: ContextVar[Optional[dict]] = ContextVar("request_memo", default=None)
+
+
+def request_memo() -> Optional[dict]:
+    """Return the current request's memo dict, or None outside of a request."""
+    return _request_memo.get()
+
+
+class RequestScopeMiddleware:
+    """
+    Pure ASGI middleware that opens a fresh memo dict for every HTTP request.
+    Lets helpers such as the user lookup avoid repeating the same query within one request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_memo.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_memo.reset(token)
@@ -0,0 +1,28 @@
+"""JSON responses encoded straight from MongoDB documents."""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Encode content with orjson. datetimes are written natively (same ISO format as
+    jsonable_encoder) and ObjectIds become strings, so documents need no pre-pass.
+    """
+    return orjson.dumps(content, default=_default)
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Returning one directly from a route also
+    skips FastAPI's jsonable_encoder copy of the content.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -1,11 +1,37 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import asyncio
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_password_pending = 0
+
+password_job_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash/verify latency, including time queued for a worker.",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+password_jobs_rejected = Counter(
+    "password_hash_rejected_total",
+    "Password operations shed because too many were pending (PasswordHashingBusy).",
+)
+password_jobs_pending = Gauge(
+    "password_hash_pending",
+    "Password operations queued or running in the worker pool.",
+)
 
 # JWT settings
 SECRET_KEY = settings.SECRET_KEY
@@ -23,6 +49,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_hash_needs_update(hashed_password: str) -> bool:
+    """True if a stored hash uses outdated settings (e.g. fewer bcrypt rounds) and should be re-hashed."""
+    return pwd_context.needs_update(hashed_password)
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when the password worker pool already has too many pending operations."""
+
+
+async def _run_password_job(kind: str, func, *args):
+    global _password_pending
+    if _password_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        password_jobs_rejected.inc()
+        raise PasswordHashingBusy("Server is busy, please retry shortly")
+
+    _password_pending += 1
+    password_jobs_pending.inc()
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_pending -= 1
+        password_jobs_pending.dec()
+        password_job_seconds.observe(time.perf_counter() - started, operation=kind)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash in the password worker pool."""
+    return await _run_password_job("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the password worker pool."""
+    return await _run_password_job("hash", get_password_hash, password)
+
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords in the worker pool, a few at a time, so a bulk import
+    neither trips the pending limit nor starves concurrent logins.
+    """
+    hashes = []
+    window = settings.PASSWORD_HASH_WORKERS
+    for start in range(0, len(passwords), window):
+        chunk = passwords[start:start + window]
+        hashes.extend(await asyncio.gather(*(get_password_hash_async(p) for p in chunk)))
+    return hashes
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
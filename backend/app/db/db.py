@@ -1,103 +1,156 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 from app.db.seed import seed_admin_user
+from app.db.mock_persistence import MockJournal, JournaledDatabase, get_journal
+from app.db.monitoring import event_listeners
+from app.core.log import get_logger
 import os
-import pickle
 import asyncio
 
+logger = get_logger(__name__)
+
 # Global MongoDB client
 client: AsyncIOMotorClient = None
 database = None
 
+# Readiness of the database layer: "connecting", "restoring", "ready" or "failed"
+db_status = "connecting"
+_ready = asyncio.Event()
+_restore_task = None
+# Periodic oplog flush of the mock database
+_journal_task = None
+
 # Path for mock data persistence
 MOCK_DB_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "mock_db.pkl"))
+MOCK_DB_OPLOG_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "mock_db.oplog"))
 
 
 async def connect_to_mongo():
-    """Initialize MongoDB connection with retry logic."""
+    """Initialize MongoDB connection, retrying with exponential backoff until a deadline."""
     global client, database
     
-    client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=1000)
+    client = AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        serverSelectionTimeoutMS=1000,
+        event_listeners=event_listeners(),
+        **settings.mongo_client_options
+    )
     
-    # Wait for MongoDB to be ready (with retries)
-    # Give MongoDB enough time to be ready in containerized deploys.
-    max_retries = 15
-    for attempt in range(max_retries):
+    # Wait for MongoDB to be ready; containerized deploys may need a few seconds
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.MONGO_CONNECT_DEADLINE_SECONDS
+    backoff = settings.MONGO_CONNECT_INITIAL_BACKOFF_SECONDS
+    attempt = 0
+    while True:
+        attempt += 1
         try:
             # Test connection
             await client.admin.command('ping')
             database = client.get_database(settings.MONGO_DATABASE)
-            # Create indexes on first connection
-            await create_indexes()
-            # Seed admin user
-            await seed_admin_user(database)
-            print("Successfully connected to MongoDB")
+            await _prepare_database()
+            _mark_ready()
+            logger.info("Successfully connected to MongoDB")
             return
         except Exception as exc:
-            print(f"Attempt {attempt + 1}: Failed to connect to MongoDB: {exc}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(2)
+            logger.warning("Attempt %d: Failed to connect to MongoDB: %s", attempt, exc)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(backoff, remaining))
+            backoff = min(backoff * 2, settings.MONGO_CONNECT_MAX_BACKOFF_SECONDS)
                 
     # Fallback to Mock
-    print(f"WARNING: Falling back to in-memory Mock MongoDB (mongomock). Persistence active at {MOCK_DB_FILE}")
-    from mongomock_motor import AsyncMongoMockClient
-    mock_client = AsyncMongoMockClient()
-    database = mock_client.get_database(settings.MONGO_DATABASE)
-    
-    # Try to load existing data
-    if os.path.exists(MOCK_DB_FILE):
+    logger.warning("Falling back to in-memory Mock MongoDB (mongomock). Persistence active at %s", MOCK_DB_FILE)
+    # The snapshot is restored in the background; /health reports "restoring" until it is done
+    global db_status, _restore_task
+    db_status = "restoring"
+    _restore_task = asyncio.create_task(_restore_mock_database())
+
+
+async def _restore_mock_database():
+    """Load the persisted mock data, rebuild indexes and only then expose the database."""
+    global database, db_status, _journal_task
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+        mock_client = AsyncMongoMockClient()
+        journal = MockJournal(MOCK_DB_FILE, MOCK_DB_OPLOG_FILE, use_mmap=settings.MOCK_DB_MMAP)
+        mock_database = mock_client.get_database(settings.MONGO_DATABASE)
+
+        # Try to load existing data (snapshot plus any newer oplog batches)
         try:
-            with open(MOCK_DB_FILE, "rb") as f:
-                db_state = pickle.load(f)
-                
-            for coll_name, docs in db_state.items():
-                if docs:
-                    # Clear collection first
-                    await database[coll_name].delete_many({})
-                    # Insert back
-                    await database[coll_name].insert_many(docs)
-            print(f"Successfully restored database from {MOCK_DB_FILE}")
+            loaded = await journal.restore(mock_database)
+            if loaded or os.path.exists(MOCK_DB_OPLOG_FILE):
+                logger.info("Restored mock database from %s", MOCK_DB_FILE, extra={"documents": loaded})
         except Exception as e:
-            print(f"Note: Could not load mock data (this is normal on first run): {e}")
-            
-    # Still seed mock admin if it doesn't exist
-    await seed_admin_user(database)
+            if os.path.exists(MOCK_DB_FILE) or os.path.exists(MOCK_DB_OPLOG_FILE):
+                # Carrying on would serve an empty database and overwrite the saved data on shutdown
+                logger.exception("Could not restore mock data from %s", MOCK_DB_FILE)
+                db_status = "failed"
+                return
+            logger.info("Could not load mock data (this is normal on first run): %s", e)
+
+        database = JournaledDatabase(mock_database, journal)
+    except Exception:
+        logger.exception("Could not start the mock database")
+        db_status = "failed"
+        return
+
+    # Indexes are built after the bulk load so inserts skip per-document index checks;
+    # the mock admin is still seeded if it doesn't exist
+    try:
+        await _prepare_database(ignore_index_errors=True)
+    except Exception:
+        # The data is loaded; a failed admin seed must not keep the server unready
+        logger.exception("Could not prepare the mock database")
+    _mark_ready()
     
     # Setup periodic save
-    asyncio.create_task(periodic_save())
+    _journal_task = asyncio.create_task(journal.run(database.unwrapped))
 
 
-async def periodic_save():
-    """Periodically save the mock database to disk."""
-    await save_mock_db() # Save once immediately
-    while True:
-        await asyncio.sleep(5) # Save every 5 seconds
+async def _prepare_database(ignore_index_errors: bool = False):
+    """Create indexes and seed the admin user concurrently."""
+    async def indexes():
         try:
-            await save_mock_db()
-        except Exception:
-            pass
+            await create_indexes()
+        except Exception as e:
+            if not ignore_index_errors:
+                raise
+            logger.warning("Could not create indexes: %s", e)
+
+    await asyncio.gather(indexes(), seed_admin_user(database))
+
+
+def _mark_ready():
+    global db_status
+    db_status = "ready"
+    _ready.set()
+
+
+async def wait_until_ready():
+    """Wait until the database is connected (and restored, in mock mode)."""
+    await _ready.wait()
 
 
 async def save_mock_db():
+    """Stop the mock database's background tasks, then flush its oplog and compact it into a fresh snapshot."""
+    for task in (_restore_task, _journal_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    if db_status == "failed":
+        # Keep whatever is on disk for inspection instead of compacting over it
+        return
+    journal = get_journal(database)
+    if journal is None:
+        return
     try:
-        if database is not None:
-            # We want to save our data to the pickle file if using mock
-            # Iterate through all collections and dump their data
-            collections = await database.list_collection_names()
-            db_state = {}
-            for coll_name in collections:
-                # Get all documents
-                docs = await database[coll_name].find().to_list(length=5000)
-                if docs:
-                    db_state[coll_name] = docs
-            
-            if db_state:
-                os.makedirs(os.path.dirname(MOCK_DB_FILE), exist_ok=True)
-                with open(MOCK_DB_FILE, "wb") as f:
-                    pickle.dump(db_state, f)
-                print(f"DATABASE PERSISTED: Saved {len(db_state)} collections to {MOCK_DB_FILE}")
+        await journal.compact(database.unwrapped)
     except Exception as e:
-        print(f"Note: Could not save mock data: {e}")
+        logger.warning("Could not save mock data: %s", e)
 
 
 async def create_indexes():
@@ -115,6 +168,10 @@ async def create_indexes():
     except Exception:
         pass
     await users_collection.create_index("mobile_phone", unique=True)
+    # Admin listings: keyset pagination per role and prefix search
+    await users_collection.create_index([("role", 1), ("_id", 1)])
+    await users_collection.create_index([("role", 1), ("name", 1)])
+    await users_collection.create_index([("role", 1), ("surname", 1)])
     
     students_collection = database.students
     try:
@@ -126,19 +183,59 @@ async def create_indexes():
     teachers_collection = database.teachers
     await teachers_collection.create_index("user_id", unique=True)
     
+    exams_collection = database.exams
+    # Multikey index serving the student's active-exam listing
+    await exams_collection.create_index("assigned_students_normalized")
+
     questions_collection = database.questions
     await questions_collection.create_index([("exam_id", 1), ("number", 1)], unique=True)
     
     exam_sessions_collection = database.exam_sessions
     await exam_sessions_collection.create_index("session_token", unique=True)
     await exam_sessions_collection.create_index("student_id")
+    await exam_sessions_collection.create_index([("exam_id", 1), ("status", 1)])
+
+    reports_collection = database.reports
+    # One report per session; scoring and re-scoring upsert by session_id
+    session_index = (await reports_collection.index_information()).get("session_id_1")
+    if not (session_index and session_index.get("unique")):
+        # Older scoring could insert a second report for a session; those must go first
+        await _dedupe_reports()
+        if session_index:
+            await reports_collection.drop_index("session_id_1")
+        await reports_collection.create_index("session_id", unique=True)
+    await reports_collection.create_index([("created_at", -1)])
+    await reports_collection.create_index([("exam_id", 1), ("created_at", -1)])
+    await reports_collection.create_index([("student_id", 1), ("created_at", -1)])
 
     registration_requests_collection = database.registration_requests
-    await registration_requests_collection.create_index("status")
-    await registration_requests_collection.create_index("created_at")
+    # The status-filtered, newest-first admin queue; also serves the per-status counts
+    await registration_requests_collection.create_index([("status", 1), ("created_at", -1), ("_id", -1)])
+    await registration_requests_collection.create_index([("created_at", -1), ("_id", -1)])
+    # Superseded by the compound indexes above
+    for index_name in ("status_1", "created_at_1"):
+        try:
+            await registration_requests_collection.drop_index(index_name)
+        except Exception:
+            pass
     await registration_requests_collection.create_index([("mobile_phone", 1), ("role", 1), ("status", 1)])
 
 
+async def _dedupe_reports():
+    """Keep only the most recently updated report of each session, before session_id becomes unique."""
+    duplicates = database.reports.aggregate([
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        {"$group": {"_id": "$session_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    stale_ids = []
+    async for group in duplicates:
+        stale_ids.extend(group["ids"][1:])
+    if stale_ids:
+        await database.reports.delete_many({"_id": {"$in": stale_ids}})
+        logger.info("Removed duplicate reports", extra={"count": len(stale_ids)})
+
+
 async def close_mongo_connection():
     """Close MongoDB connection."""
     global client
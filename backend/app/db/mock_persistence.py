@@ -0,0 +1,323 @@
+"""Incremental persistence for the in-memory mongomock fallback.
+
+Every write made through the wrapped database is recorded as a document-level
+operation ("put" of the full document after the write, or "del" of its _id).
+Operations are appended to an oplog file in batches, off the event loop, and
+the oplog is periodically compacted into a full snapshot. Restoring loads the
+snapshot and replays the oplog batches written after it.
+
+Snapshots are a stream of pickled records: a header, then chunks of
+documents per collection, then an end marker, so they can be loaded
+chunk by chunk instead of unpickling the whole database at once. The older
+single-dict pickle format is still readable.
+"""
+import asyncio
+import mmap
+import os
+import pickle
+from typing import Optional
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FORMAT = "mock-snapshot/2"
+# Documents per pickled chunk in a snapshot; restore loads one chunk at a time
+SNAPSHOT_CHUNK_SIZE = 1000
+# Reserved key holding the last included oplog batch in single-dict snapshots
+SNAPSHOT_SEQ_KEY = "__oplog_seq__"
+# Compact the oplog into a new snapshot after this many recorded operations
+COMPACT_AFTER_OPS = 20000
+
+_WRITE_METHODS = {
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_replace",
+    "find_one_and_delete", "bulk_write",
+}
+_SINGLE_DOC_METHODS = {
+    "update_one", "replace_one", "delete_one",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+}
+
+
+class MockJournal:
+    """Oplog + snapshot persistence engine for the mock database."""
+
+    def __init__(self, snapshot_file: str, oplog_file: str, use_mmap: bool = False):
+        self.snapshot_file = snapshot_file
+        self.oplog_file = oplog_file
+        self.use_mmap = use_mmap
+        self._pending: list = []
+        self._seq = 0
+        self._ops_since_snapshot = 0
+        self._lock = asyncio.Lock()
+
+    def record_put(self, collection: str, doc: dict) -> None:
+        self._pending.append(("put", collection, doc))
+
+    def record_delete(self, collection: str, doc_id) -> None:
+        self._pending.append(("del", collection, doc_id))
+
+    async def restore(self, database) -> int:
+        """
+        Load the snapshot chunk by chunk, then replay newer oplog batches into database.
+        Returns the number of snapshot documents loaded.
+        """
+        loaded = 0
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_file) and os.path.getsize(self.snapshot_file) > 0:
+            loop = asyncio.get_running_loop()
+            with open(self.snapshot_file, "rb") as f:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.use_mmap else f
+                try:
+                    # Unpickling happens off the event loop, one record at a time
+                    header = await loop.run_in_executor(None, pickle.load, source)
+                    if isinstance(header, dict) and header.get("format") == SNAPSHOT_FORMAT:
+                        snapshot_seq = header.get("oplog_seq", 0)
+                        while True:
+                            record = await loop.run_in_executor(None, pickle.load, source)
+                            if record[0] == "end":
+                                break
+                            _, coll_name, docs = record
+                            await database[coll_name].insert_many(docs)
+                            loaded += len(docs)
+                    else:
+                        snapshot_seq = header.pop(SNAPSHOT_SEQ_KEY, 0)
+                        for coll_name, docs in header.items():
+                            for start in range(0, len(docs), SNAPSHOT_CHUNK_SIZE):
+                                await database[coll_name].insert_many(docs[start:start + SNAPSHOT_CHUNK_SIZE])
+                                await asyncio.sleep(0)
+                            loaded += len(docs)
+                finally:
+                    if source is not f:
+                        source.close()
+        self._seq = snapshot_seq
+
+        for seq, batch in _read_oplog(self.oplog_file):
+            if seq <= snapshot_seq:
+                continue
+            for op, coll_name, payload in batch:
+                if op == "put":
+                    await database[coll_name].replace_one({"_id": payload["_id"]}, payload, upsert=True)
+                else:
+                    await database[coll_name].delete_one({"_id": payload})
+                self._ops_since_snapshot += 1
+            self._seq = max(self._seq, seq)
+            await asyncio.sleep(0)
+        return loaded
+
+    async def flush(self) -> int:
+        """Append pending operations to the oplog. Returns the number of operations written."""
+        async with self._lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, []
+        self._seq += 1
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _append_oplog, self.oplog_file, self._seq, batch)
+        self._ops_since_snapshot += len(batch)
+        return len(batch)
+
+    async def compact(self, database) -> None:
+        """Write a full snapshot of database and truncate the oplog it supersedes."""
+        async with self._lock:
+            await self._flush()
+            # mongomock-motor never yields inside these calls, so the capture is consistent
+            db_state = {}
+            for coll_name in await database.list_collection_names():
+                docs = await database[coll_name].find().to_list(length=None)
+                if docs:
+                    db_state[coll_name] = docs
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_snapshot, self.snapshot_file, self.oplog_file, db_state, self._seq)
+            self._ops_since_snapshot = 0
+        logger.info("Mock database compacted", extra={"collections": len(db_state), "snapshot": self.snapshot_file})
+
+    async def run(self, database, interval: float = 5) -> None:
+        """Flush the oplog every interval seconds and compact it once it grows large."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+                if self._ops_since_snapshot >= COMPACT_AFTER_OPS:
+                    await self.compact(database)
+            except Exception as e:
+                logger.warning("Could not save mock data: %s", e)
+
+
+class JournaledCollection:
+    """Collection proxy that records the documents touched by every write."""
+
+    def __init__(self, collection, journal: MockJournal):
+        self._collection = collection
+        self._journal = journal
+        self._name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in _WRITE_METHODS:
+            return attr
+
+        async def journaled(*args, **kwargs):
+            return await self._journaled_write(name, attr, args, kwargs)
+        return journaled
+
+    async def _journaled_write(self, method: str, func, args, kwargs):
+        # mongomock-motor runs each call synchronously, so nothing interleaves
+        # between collecting the affected ids and reading them back.
+        touched = await self._affected_ids(method, args, kwargs)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            # An unordered insert_many/bulk_write can fail after writing part of the batch
+            touched.extend(self._attempted_ids(method, args, kwargs))
+            await self._record(touched)
+            raise
+        touched.extend(self._result_ids(method, result, args, kwargs))
+
+        if method == "find_one_and_update" and kwargs.get("upsert") and not touched:
+            doc = await self._collection.find_one(_filter_arg(args, kwargs), {"_id": 1})
+            if doc:
+                touched.append(doc["_id"])
+
+        await self._record(touched)
+        return result
+
+    async def _affected_ids(self, method: str, args, kwargs) -> list:
+        if method in ("insert_one", "insert_many"):
+            return []
+        if method == "bulk_write":
+            requests = args[0] if args else kwargs.get("requests", [])
+            filters = [getattr(r, "_filter", None) for r in requests]
+            filters = [f for f in filters if f is not None]
+            if not filters:
+                return []
+            query = {"$or": filters}
+        else:
+            query = _filter_arg(args, kwargs)
+        if method in _SINGLE_DOC_METHODS:
+            doc = await self._collection.find_one(query, {"_id": 1}, sort=kwargs.get("sort"))
+            return [doc["_id"]] if doc else []
+        return [doc["_id"] async for doc in self._collection.find(query, {"_id": 1})]
+
+    def _result_ids(self, method: str, result, args, kwargs) -> list:
+        if method == "insert_one":
+            return [result.inserted_id]
+        if method == "insert_many":
+            return list(result.inserted_ids)
+        if method in ("update_one", "update_many", "replace_one"):
+            return [result.upserted_id] if result.upserted_id is not None else []
+        if method == "bulk_write":
+            requests = args[0] if args else kwargs.get("requests", [])
+            ids = list((result.upserted_ids or {}).values())
+            ids.extend(r._doc["_id"] for r in requests if isinstance(getattr(r, "_doc", None), dict) and "_id" in r._doc)
+            return ids
+        return []
+
+    def _attempted_ids(self, method: str, args, kwargs) -> list:
+        # The driver assigns _id to documents in place before sending them
+        if method == "insert_one":
+            docs = [args[0] if args else kwargs.get("document")]
+        elif method == "insert_many":
+            docs = args[0] if args else kwargs.get("documents", [])
+        elif method == "bulk_write":
+            requests = args[0] if args else kwargs.get("requests", [])
+            docs = [getattr(r, "_doc", None) for r in requests]
+        else:
+            return []
+        return [doc["_id"] for doc in docs if isinstance(doc, dict) and "_id" in doc]
+
+    async def _record(self, ids: list) -> None:
+        if not ids:
+            return
+        unique_ids = list(dict.fromkeys(ids))
+        found = {doc["_id"]: doc async for doc in self._collection.find({"_id": {"$in": unique_ids}})}
+        for doc_id in unique_ids:
+            if doc_id in found:
+                self._journal.record_put(self._name, found[doc_id])
+            else:
+                self._journal.record_delete(self._name, doc_id)
+
+
+class JournaledDatabase:
+    """Database proxy handing out JournaledCollection objects."""
+
+    def __init__(self, database, journal: MockJournal):
+        self._database = database
+        self._journal = journal
+        self._collections: dict = {}
+
+    def __getitem__(self, name: str) -> JournaledCollection:
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = JournaledCollection(self._database[name], self._journal)
+        return coll
+
+    def get_collection(self, name: str, *args, **kwargs) -> JournaledCollection:
+        return self[name]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or hasattr(type(self._database), name):
+            return getattr(self._database, name)
+        return self[name]
+
+    @property
+    def unwrapped(self):
+        """The underlying database, for bulk loads that must not be journaled."""
+        return self._database
+
+
+def _filter_arg(args, kwargs) -> dict:
+    if args:
+        return args[0]
+    return kwargs.get("filter", {})
+
+
+def _append_oplog(path: str, seq: int, batch: list) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        pickle.dump((seq, batch), f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_oplog(path: str):
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+            except Exception:
+                # A crash can leave the last batch half-written
+                return
+
+
+def _write_snapshot(snapshot_file: str, oplog_file: str, db_state: dict, oplog_seq: int) -> None:
+    os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+    tmp_file = snapshot_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump({"format": SNAPSHOT_FORMAT, "oplog_seq": oplog_seq}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for coll_name, docs in db_state.items():
+            for start in range(0, len(docs), SNAPSHOT_CHUNK_SIZE):
+                chunk = docs[start:start + SNAPSHOT_CHUNK_SIZE]
+                pickle.dump(("docs", coll_name, chunk), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(("end",), f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, snapshot_file)
+    # Batches up to the snapshot's seq are skipped on restore, so a crash before
+    # this truncation is harmless
+    with open(oplog_file, "wb"):
+        pass
+
+
+def get_journal(database) -> Optional[MockJournal]:
+    """Return the journal behind a journaled database, or None for a real MongoDB."""
+    if isinstance(database, JournaledDatabase):
+        return database._journal
+    return None
@@ -0,0 +1,136 @@
+"""pymongo event listeners feeding the /metrics endpoint.
+
+Command latency is recorded per collection and operation, commands slower than
+MONGO_SLOW_QUERY_MS are logged, and pool listeners track checkout waits and
+connections in use so the pool can be sized for exam-day peaks.
+"""
+import threading
+from pymongo import monitoring
+from app.core.config import settings
+from app.core.http_metrics import count_db_call
+from app.core.log import get_logger
+from app.core.metrics import Counter, Gauge, Histogram
+
+logger = get_logger(__name__)
+
+# Commands whose first field is not a collection name
+_NO_COLLECTION = {"ping", "hello", "ismaster", "isMaster", "buildInfo", "endSessions", "saslStart", "saslContinue"}
+
+db_command_seconds = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by collection and operation.",
+    ("collection", "command"),
+)
+db_command_failures = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error.",
+    ("collection", "command"),
+)
+db_slow_commands = Counter(
+    "mongodb_slow_commands_total",
+    "MongoDB commands slower than MONGO_SLOW_QUERY_MS.",
+    ("collection", "command"),
+)
+pool_checkout_seconds = Histogram(
+    "mongodb_pool_checkout_duration_seconds",
+    "Time spent waiting for a pooled connection.",
+)
+pool_checkout_failures = Counter(
+    "mongodb_pool_checkout_failures_total",
+    "Connection checkouts that failed, e.g. on wait-queue timeout.",
+    ("reason",),
+)
+pool_connections_in_use = Gauge(
+    "mongodb_pool_connections_in_use",
+    "Connections currently checked out of the pool.",
+)
+pool_connections_open = Gauge(
+    "mongodb_pool_connections_open",
+    "Connections currently open in the pool.",
+)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Records command latency and logs slow commands."""
+
+    def __init__(self, slow_ms: int):
+        self.slow_ms = slow_ms
+        # (connection_id, request_id) -> collection of in-flight commands
+        self._collections: dict = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = ""
+        if event.command_name not in _NO_COLLECTION:
+            target = event.command.get(event.command_name)
+            if isinstance(target, str):
+                collection = target
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+        count_db_call()
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        labels = {"collection": collection, "command": event.command_name}
+        seconds = event.duration_micros / 1_000_000
+        db_command_seconds.observe(seconds, **labels)
+        if failed:
+            db_command_failures.inc(**labels)
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            db_slow_commands.inc(**labels)
+            logger.warning(
+                "Slow MongoDB command",
+                extra={"db": event.database_name, "collection": collection, "command": event.command_name, "duration_ms": round(seconds * 1000, 1)}
+            )
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Tracks checkout waits and connection counts."""
+
+    def connection_checked_out(self, event):
+        pool_connections_in_use.inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            pool_checkout_seconds.observe(duration)
+
+    def connection_check_out_failed(self, event):
+        pool_checkout_failures.inc(reason=str(event.reason))
+
+    def connection_checked_in(self, event):
+        pool_connections_in_use.dec()
+
+    def connection_created(self, event):
+        pool_connections_open.inc()
+
+    def connection_closed(self, event):
+        pool_connections_open.dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def event_listeners() -> list:
+    """Listeners to pass to the Motor client."""
+    return [CommandMetricsListener(settings.MONGO_SLOW_QUERY_MS), PoolMetricsListener()]
@@ -1,5 +1,8 @@
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.log import get_logger
+from app.core.security import get_password_hash_async, verify_password_async, password_hash_needs_update
+
+logger = get_logger(__name__)
 
 
 async def seed_admin_user(database):
@@ -10,6 +13,8 @@ async def seed_admin_user(database):
     Args:
         database: MongoDB database instance
     """
+    from app.clients.user_client import invalidate_user_cache
+
     if database is None:
         return
     
@@ -18,35 +23,50 @@ async def seed_admin_user(database):
     admin_surname = settings.ADMIN_SURNAME
     admin_password = settings.ADMIN_PASSWORD
     
-    password_hash = get_password_hash(admin_password)
-    print(f"DEBUG: Generated password hash for admin: {password_hash[:20]}...")
-    
     # Check if admin user already exists by mobile_phone (new schema)
     existing_admin = await database.users.find_one({"mobile_phone": admin_mobile_phone})
     if existing_admin:
-        print(f"DEBUG: Found existing admin, current password_hash: {existing_admin.get('password_hash', 'NOT FOUND')[:20] if existing_admin.get('password_hash') else 'NOT FOUND'}...")
+        logger.debug("Found existing admin", extra={"has_password_hash": bool(existing_admin.get("password_hash"))})
+    migrate_admin = None
     
     # If not found, check for admin by role (old schema migration)
     if not existing_admin:
-        existing_admin = await database.users.find_one({"role": "admin"})
-        if existing_admin:
-            # Migrate old admin to new schema
-            await database.users.update_one(
-                {"_id": existing_admin["_id"]},
-                {"$set": {
-                    "mobile_phone": admin_mobile_phone,
-                    "name": admin_name,
-                    "surname": admin_surname,
-                    "password_hash": password_hash,
-                    "is_active": True,
-                    "role": "admin"
-                }, "$unset": {
-                    "email": "",
-                    "username": ""
-                }}
-            )
-            print(f"Admin user migrated to new schema: {admin_mobile_phone}")
-    
+        migrate_admin = await database.users.find_one({"role": "admin"})
+
+    # Reuse the stored hash when it already matches the configured password,
+    # so a restart does not pay for a fresh bcrypt hash every time
+    stored_hash = (existing_admin or migrate_admin or {}).get("password_hash")
+    hash_reused = bool(
+        stored_hash
+        and not password_hash_needs_update(stored_hash)
+        and await verify_password_async(admin_password, stored_hash)
+    )
+    if hash_reused:
+        password_hash = stored_hash
+        logger.debug("Stored admin password hash is current, skipping re-hash")
+    else:
+        password_hash = await get_password_hash_async(admin_password)
+        logger.debug("Generated new password hash for admin")
+
+    if migrate_admin:
+        existing_admin = migrate_admin
+        # Migrate old admin to new schema
+        await database.users.update_one(
+            {"_id": existing_admin["_id"]},
+            {"$set": {
+                "mobile_phone": admin_mobile_phone,
+                "name": admin_name,
+                "surname": admin_surname,
+                "password_hash": password_hash,
+                "is_active": True,
+                "role": "admin"
+            }, "$unset": {
+                "email": "",
+                "username": ""
+            }}
+        )
+        logger.info("Admin user migrated to new schema: %s", admin_mobile_phone)
+
     admin_user = {
         "mobile_phone": admin_mobile_phone,
         "name": admin_name,
@@ -56,7 +76,12 @@ async def seed_admin_user(database):
         "role": "admin"
     }
     
-    if existing_admin:
+    up_to_date = existing_admin is not None and hash_reused and all(
+        existing_admin.get(field) == value for field, value in admin_user.items()
+    )
+    if up_to_date:
+        logger.info("Admin user up to date: %s", admin_mobile_phone)
+    elif existing_admin:
         # Update existing admin to ensure it matches current schema and password
         result = await database.users.update_one(
             {"mobile_phone": admin_mobile_phone},
@@ -68,31 +93,32 @@ async def seed_admin_user(database):
                 "role": "admin"
             }}
         )
-        print(f"Admin user updated: {admin_mobile_phone} (modified: {result.modified_count})")
+        invalidate_user_cache(existing_admin["_id"])
+        logger.info("Admin user updated: %s", admin_mobile_phone, extra={"modified": result.modified_count})
         
         # Verify the password was stored correctly
         updated_admin = await database.users.find_one({"mobile_phone": admin_mobile_phone})
-        if updated_admin:
+        if updated_admin and not hash_reused:
             stored_hash = updated_admin.get("password_hash")
-            if stored_hash and verify_password(admin_password, stored_hash):
-                print(f"DEBUG: Password verification SUCCESS after update")
+            if stored_hash and await verify_password_async(admin_password, stored_hash):
+                logger.debug("Password verification SUCCESS after update")
             else:
-                print(f"DEBUG: Password verification FAILED after update!")
+                logger.warning("Admin password verification FAILED after update")
     else:
         # Create new admin user
         await database.users.insert_one(admin_user)
-        print(f"Admin user created: {admin_mobile_phone}")
+        logger.info("Admin user created: %s", admin_mobile_phone)
         
         # Verify the password was stored correctly
         new_admin = await database.users.find_one({"mobile_phone": admin_mobile_phone})
         if new_admin:
             stored_hash = new_admin.get("password_hash")
-            if stored_hash and verify_password(admin_password, stored_hash):
-                print(f"DEBUG: Password verification SUCCESS after creation")
+            if stored_hash and await verify_password_async(admin_password, stored_hash):
+                logger.debug("Password verification SUCCESS after creation")
             else:
-                print(f"DEBUG: Password verification FAILED after creation!")
+                logger.warning("Admin password verification FAILED after creation")
     
-    print(f"Admin credentials - Mobile: {admin_mobile_phone}, Password: {admin_password}")
+    logger.debug("Admin credentials - Mobile: %s, Password: %s", admin_mobile_phone, admin_password)
 
 
 async def seed_sample_data(database):
@@ -1,27 +1,59 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+import app.db.db as db
 from app.db.db import connect_to_mongo, close_mongo_connection
 from app.api.routes import auth, exam, admin, registration, report
 from app.core.config import settings
+from app.core.log import get_logger, setup_logging, shutdown_logging
+from app.core.metrics import render_metrics
+from app.core.http_metrics import MetricsMiddleware, monitor_event_loop
+from app.core.readiness import ReadinessMiddleware
+from app.core.request_scope import RequestScopeMiddleware
+from app.services.answer_buffer import answer_buffer
+from app.services import pdf_service
+
+
+setup_logging()
+logger = get_logger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await connect_to_mongo()
+    connect_task = None
+    if settings.DB_CONNECT_IN_BACKGROUND:
+        # Only /health and /metrics are served until the database is ready (see ReadinessMiddleware)
+        connect_task = asyncio.create_task(connect_to_mongo())
+    else:
+        await connect_to_mongo()
+    await answer_buffer.start()
+    loop_monitor = asyncio.create_task(monitor_event_loop())
     yield
     # Shutdown
+    loop_monitor.cancel()
+    if connect_task is not None and not connect_task.done():
+        connect_task.cancel()
+    try:
+        await answer_buffer.stop()
+    except Exception as exc:
+        logger.warning("Could not flush buffered answers on shutdown: %s", exc)
     from app.db.db import save_mock_db
     try:
         await save_mock_db()
     except Exception:
         pass
+    pdf_service.shutdown()
     await close_mongo_connection()
+    shutdown_logging()
 
 
 app = FastAPI(title="Online Assessment Platform", lifespan=lifespan)
 
+# Inside CORS, so the 503s it sends while the database warms up still carry CORS headers
+app.add_middleware(ReadinessMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -29,6 +61,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestScopeMiddleware)
+# Added last so it is the outermost middleware and times the whole stack
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -45,4 +80,13 @@ def root():
 
 @app.get("/health")
 def health():
+    if db.db_status != "ready":
+        # e.g. "restoring" while the mock database snapshot is still loading
+        return JSONResponse(status_code=503, content={"status": db.db_status})
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the in-process metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
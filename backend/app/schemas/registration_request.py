@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from pydantic import AliasChoices, BaseModel, EmailStr, Field
 
 
@@ -45,5 +45,10 @@ class RegistrationRequestApprove(BaseModel):
     password: str = Field(..., min_length=6)
 
 
+class RegistrationRequestBulkApprove(BaseModel):
+    request_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    password: str = Field(..., min_length=6)
+
+
 class RegistrationRequestReject(BaseModel):
     reason: Optional[str] = None
@@ -0,0 +1,233 @@
+"""Per-exam score and question statistics, maintained incrementally.
+
+Each exam has one exam_analytics document of running sums, so reading it costs
+the same however many students took the exam:
+
+    count, score_sum, score_sq_sum     - completed sessions and score moments
+    score_counts.<score>               - sessions per score, for median/percentiles/histogram
+    questions.<qid>.answered           - sessions that answered the question
+    questions.<qid>.correct            - sessions that answered it correctly
+    questions.<qid>.correct_score_sum  - total score of those sessions, for discrimination
+    questions.<qid>.options.<key>      - MCQ option distribution
+
+A completed session adds its contribution with one $inc. Sessions carry an
+analytics_counted flag, set by whichever of the $inc or a rebuild counts them
+first, so no session is added twice. Re-scoring, or a document built for a
+different answer key, rebuilds it from exam_sessions.
+"""
+import math
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+import app.db.db as db
+from app.services.scoring import AnswerKey, get_answer_key, normalize_answer
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BUCKETS = 10
+REBUILD_BATCH_SIZE = 1000
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def _session_delta(key: AnswerKey, responses: dict, score: int) -> dict:
+    """Flat {dotted path: increment} contribution of one completed session."""
+    delta = {
+        "count": 1,
+        "score_sum": score,
+        "score_sq_sum": score * score,
+        f"score_counts.{score}": 1,
+    }
+    scored = set(key.question_ids)
+    for q_id, value in (responses or {}).items():
+        # Only the exam's own questions; ids also become field names
+        if q_id not in scored and q_id not in key.mcq_ids:
+            continue
+        answer = normalize_answer(value)
+        if not answer:
+            continue
+        delta[f"questions.{q_id}.answered"] = 1
+        if q_id in key.mcq_ids and len(answer) == 1 and answer.isalnum():
+            delta[f"questions.{q_id}.options.{answer}"] = 1
+    for q_id, answer in zip(key.question_ids, key.answers):
+        if normalize_answer((responses or {}).get(q_id)) == answer:
+            delta[f"questions.{q_id}.correct"] = 1
+            delta[f"questions.{q_id}.correct_score_sum"] = score
+    return delta
+
+
+def _nest(flat: dict) -> dict:
+    doc = {}
+    for path, value in flat.items():
+        *parents, leaf = path.split(".")
+        node = doc
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return doc
+
+
+async def record_completion(session_id, score: int) -> None:
+    """
+    Add a newly completed session to its exam's statistics.
+    Exams without statistics yet are left alone; they are built in full on first read.
+    """
+    # Claim the session; a rebuild may already have counted it
+    claimed = await _db().exam_sessions.update_one(
+        {"_id": session_id, "analytics_counted": {"$ne": True}},
+        {"$set": {"analytics_counted": True}}
+    )
+    if not claimed.modified_count:
+        return
+    session = await _db().exam_sessions.find_one({"_id": session_id}, {"exam_id": 1, "responses": 1})
+    if not session:
+        return
+    key = await get_answer_key(session["exam_id"])
+    await _db().exam_analytics.update_one(
+        {"_id": session["exam_id"], "total": key.total},
+        {
+            "$inc": _session_delta(key, session.get("responses"), score),
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+    )
+
+
+async def rebuild_exam_analytics(exam_oid: ObjectId) -> dict:
+    """Recompute an exam's statistics from all its completed sessions and store them."""
+    key = await get_answer_key(exam_oid)
+    totals = {"count": 0, "score_sum": 0, "score_sq_sum": 0}
+    counted = []
+
+    async def mark_counted():
+        # A record_completion still pending for these sessions must not add them again
+        await _db().exam_sessions.update_many(
+            {"_id": {"$in": counted}, "analytics_counted": {"$ne": True}},
+            {"$set": {"analytics_counted": True}}
+        )
+        counted.clear()
+
+    cursor = _db().exam_sessions.find(
+        {"exam_id": exam_oid, "status": "completed"},
+        {"responses": 1},
+        batch_size=REBUILD_BATCH_SIZE
+    )
+    async for session in cursor:
+        responses = session.get("responses") or {}
+        for path, value in _session_delta(key, responses, key.score(responses)).items():
+            totals[path] = totals.get(path, 0) + value
+        counted.append(session["_id"])
+        if len(counted) >= REBUILD_BATCH_SIZE:
+            await mark_counted()
+    if counted:
+        await mark_counted()
+
+    doc = {
+        "_id": exam_oid,
+        "total": key.total,
+        "score_counts": {},
+        "questions": {},
+        **_nest(totals),
+        "updated_at": datetime.utcnow(),
+    }
+    await _db().exam_analytics.replace_one({"_id": exam_oid}, doc, upsert=True)
+    return doc
+
+
+def _percentile(score_counts: list, count: int, pct: float) -> float:
+    """Linearly interpolated percentile over sorted (score, sessions) pairs."""
+    rank = (count - 1) * pct / 100
+    lower, upper = math.floor(rank), math.ceil(rank)
+    values = {}
+    seen = 0
+    for score, sessions in score_counts:
+        for idx in (lower, upper):
+            if seen <= idx < seen + sessions:
+                values[idx] = score
+        seen += sessions
+        if upper in values:
+            break
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def _discrimination(question: dict, count: int, score_sum: int, sd: float) -> Optional[float]:
+    """
+    Point-biserial correlation between answering correctly and the total score.
+    Unlike the upper/lower-group index it only needs running sums.
+    """
+    correct = question.get("correct", 0)
+    incorrect = count - correct
+    if not correct or not incorrect or not sd:
+        return None
+    mean_correct = question.get("correct_score_sum", 0) / correct
+    mean_incorrect = (score_sum - question.get("correct_score_sum", 0)) / incorrect
+    return round((mean_correct - mean_incorrect) / sd * math.sqrt(correct * incorrect) / count, 4)
+
+
+async def get_exam_analytics(exam_id: str) -> dict:
+    """Score distribution and per-question statistics of an exam."""
+    exam_oid = ObjectId(exam_id)
+    exam = await _db().exams.find_one({"_id": exam_oid}, {"title": 1})
+    if not exam:
+        raise ValueError("Exam not found")
+
+    key = await get_answer_key(exam_oid)
+    stats = await _db().exam_analytics.find_one({"_id": exam_oid})
+    if stats is None or stats.get("total") != key.total:
+        stats = await rebuild_exam_analytics(exam_oid)
+
+    count = stats.get("count", 0)
+    score_sum = stats.get("score_sum", 0)
+    score_counts = sorted((int(score), n) for score, n in stats.get("score_counts", {}).items() if n)
+    mean = score_sum / count if count else None
+    sd = math.sqrt(max(stats.get("score_sq_sum", 0) / count - mean * mean, 0)) if count else None
+
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for score, sessions in score_counts:
+        fraction = score / key.total if key.total else 0
+        histogram[min(int(fraction * HISTOGRAM_BUCKETS), HISTOGRAM_BUCKETS - 1)] += sessions
+    bucket_width = 100 // HISTOGRAM_BUCKETS
+
+    question_stats = stats.get("questions", {})
+    scored_ids = set(key.question_ids)
+    questions = []
+    cursor = _db().questions.find({"exam_id": exam_oid}, {"number": 1, "type": 1}).sort("number", 1)
+    async for question in cursor:
+        q_id = str(question["_id"])
+        entry = question_stats.get(q_id, {})
+        scored = q_id in scored_ids
+        questions.append({
+            "question_id": q_id,
+            "number": question.get("number"),
+            "type": question.get("type"),
+            "answered": entry.get("answered", 0),
+            "correct_rate": round(entry.get("correct", 0) / count, 4) if scored and count else None,
+            "option_distribution": entry.get("options", {}) if q_id in key.mcq_ids else None,
+            "discrimination": _discrimination(entry, count, score_sum, sd) if scored and count else None,
+        })
+
+    return {
+        "exam_id": exam_id,
+        "title": exam.get("title"),
+        "sessions": count,
+        "total_questions": key.total,
+        "mean": round(mean, 4) if count else None,
+        "mean_percentage": round(key.percentage(mean), 2) if count else None,
+        "std_dev": round(sd, 4) if count else None,
+        "min": score_counts[0][0] if count else None,
+        "max": score_counts[-1][0] if count else None,
+        "median": _percentile(score_counts, count, 50) if count else None,
+        "percentiles": {
+            f"p{pct}": _percentile(score_counts, count, pct) if count else None
+            for pct in PERCENTILES
+        },
+        "histogram": [
+            {"range": f"{idx * bucket_width}-{(idx + 1) * bucket_width}%", "count": sessions}
+            for idx, sessions in enumerate(histogram)
+        ],
+        "questions": questions,
+        "updated_at": stats.get("updated_at"),
+    }
@@ -0,0 +1,212 @@
+"""Write-behind buffer for exam answers.
+
+Answers are coalesced in memory per (session, question) and written to
+exam_sessions in batches. Every accepted answer is first appended to a local
+journal so answers that were not flushed yet survive a crash and are replayed
+on the next startup.
+"""
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+import app.db.db as db
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Journal of accepted answers that may not have reached the database yet
+ANSWER_JOURNAL_FILE = os.path.abspath(os.path.join(os.path.dirname(db.__file__), "answer_journal.jsonl"))
+
+
+class AnswerBuffer:
+    """Coalescing, journaled write-behind buffer for exam_sessions.responses."""
+
+    def __init__(self, journal_file: str, flush_interval: float, fsync: bool = False):
+        self.journal_file = journal_file
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        # session ObjectId -> {question_id: answer_text}
+        self._pending: dict = {}
+        self._journal = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Journals left by a previous run must not be discarded before they are replayed
+        self._replayed = False
+
+    async def start(self) -> None:
+        """Once the database is ready, replay any journal left by a previous run, then flush periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write everything that is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as exc:
+            # The journal is kept and replayed on the next startup
+            logger.warning("Could not flush buffered answers on shutdown: %s", exc)
+        self._close_journal()
+
+    def record(self, session_id: ObjectId, question_id: str, answer_text: str) -> None:
+        """Accept an answer: journal it, then keep only the latest answer per question."""
+        journal = self._open_journal()
+        journal.write(json.dumps({"s": str(session_id), "q": question_id, "a": answer_text}) + "\n")
+        journal.flush()
+        if self.fsync:
+            os.fsync(journal.fileno())
+        self._pending.setdefault(session_id, {})[question_id] = answer_text
+
+    def pending_for(self, session_id: ObjectId) -> dict:
+        """Answers for a session that are accepted but not yet written to the database."""
+        return dict(self._pending.get(session_id, {}))
+
+    async def flush_session(self, session_id: ObjectId) -> None:
+        """Write one session's pending answers now, e.g. right before it is completed."""
+        # Wait for a running bulk flush, which may hold this session's answers
+        async with self._flush_lock:
+            if not self._replayed:
+                # Journaled answers of this session from a previous run must land first
+                await self._flush()
+                return
+            answers = self._pending.pop(session_id, None)
+            if not answers:
+                return
+            try:
+                await _write_batch({session_id: answers})
+            except Exception:
+                self._restore({session_id: answers})
+                raise
+
+    async def flush(self) -> int:
+        """Write all pending answers with one bulk_write. Returns the number of sessions updated."""
+        async with self._flush_lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        """
+        Flush with the lock held. The first successful flush also replays the
+        journals of a previous run; journal files are only removed once written.
+        """
+        batch, self._pending = self._pending, {}
+        # Answers recorded from here on go to a fresh journal file
+        rotated = self._rotate_journal()
+        if not self._replayed and rotated:
+            journaled = _read_journals(rotated)
+            # Pending answers are newer than anything journaled before them
+            for session_id, answers in batch.items():
+                journaled.setdefault(session_id, {}).update(answers)
+            batch = journaled
+        try:
+            await _write_batch(batch)
+        except Exception:
+            self._restore(batch)
+            raise
+        if not self._replayed:
+            self._replayed = True
+            if rotated:
+                logger.info("Replayed buffered answers", extra={"sessions": len(batch), "journal_files": len(rotated)})
+        for path in rotated:
+            _remove(path)
+        return len(batch)
+
+    def _restore(self, batch: dict) -> None:
+        # Put a failed batch back without overwriting answers that arrived meanwhile
+        for session_id, answers in batch.items():
+            current = self._pending.setdefault(session_id, {})
+            for question_id, answer_text in answers.items():
+                current.setdefault(question_id, answer_text)
+
+    async def _run(self) -> None:
+        await db.wait_until_ready()
+        while True:
+            # The first flush replays what a previous run left in the journal
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.warning("Could not flush buffered answers: %s", exc)
+            await asyncio.sleep(self.flush_interval)
+
+    def _open_journal(self):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+        return self._journal
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _rotate_journal(self) -> list:
+        """Move the current journal aside and return every rotated file not yet flushed."""
+        self._close_journal()
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, f"{self.journal_file}.{time.time_ns()}")
+        return _rotated_journals(self.journal_file)
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+async def _write_batch(batch: dict) -> None:
+    operations = [
+        UpdateOne(
+            {"_id": session_id, "status": "active"},
+            {"$set": {f"responses.{q}": a for q, a in answers.items()}}
+        )
+        for session_id, answers in batch.items()
+        if answers
+    ]
+    if operations:
+        await _db().exam_sessions.bulk_write(operations, ordered=False)
+
+
+def _read_journals(paths: list) -> dict:
+    """Latest journaled answer per (session, question) across journal files, oldest file first."""
+    batch: dict = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half-written
+                    continue
+                batch.setdefault(ObjectId(entry["s"]), {})[entry["q"]] = entry["a"]
+    return batch
+
+
+def _rotated_journals(journal_file: str) -> list:
+    """Rotated journal files, oldest first."""
+    paths = glob.glob(glob.escape(journal_file) + ".*")
+    return sorted(paths, key=lambda path: int(path.rsplit(".", 1)[1]))
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+answer_buffer = AnswerBuffer(
+    ANSWER_JOURNAL_FILE,
+    flush_interval=settings.ANSWER_FLUSH_INTERVAL_SECONDS,
+    fsync=settings.ANSWER_JOURNAL_FSYNC,
+)
@@ -1,5 +1,5 @@
 from app.clients.user_client import find_user_by_mobile_phone, is_user_admin
-from app.core.security import verify_password, create_access_token
+from app.core.security import verify_password_async, create_access_token
 
 
 async def authenticate_user(mobile_phone: str, password: str) -> dict:
@@ -16,6 +16,7 @@ async def authenticate_user(mobile_phone: str, password: str) -> dict:
     
     Raises:
         ValueError: If authentication fails or user is student
+        PasswordHashingBusy: If the password worker pool is saturated
     """
     # Find user by mobile phone
     user = await find_user_by_mobile_phone(mobile_phone)
@@ -27,7 +28,7 @@ async def authenticate_user(mobile_phone: str, password: str) -> dict:
     if not password_hash:
         raise ValueError("Incorrect mobile phone or password")
     
-    if not verify_password(password, password_hash):
+    if not await verify_password_async(password, password_hash):
         raise ValueError("Incorrect mobile phone or password")
     
     # Check if user is active
@@ -0,0 +1,247 @@
+"""Bulk exam import from JSON-lines or CSV uploads.
+
+Every row is one question and carries the columns of the exam it belongs to:
+
+    exam_title, exam_subject, duration_minutes, start_at, end_at, is_active,
+    assigned_students, number, statement, type, answer, options / option_a..option_d, media_url
+
+Rows of the same exam_title form one exam; its settings come from its first row.
+Rows are parsed from the upload in a worker thread, a batch at a time, so reading a
+large upload from disk never blocks the event loop. They are validated against the Question model
+and inserted in batches with pre-generated ObjectIds, so each exam document is written
+once at the end with its complete question list.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import AsyncIterator, Iterator, Optional
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+import app.db.db as db
+from app.models.question import Question
+from app.services.exam_service import normalize_assignments, invalidate_question_cache
+from app.services.scoring import invalidate_answer_key
+
+IMPORT_BATCH_SIZE = 500
+# Rows parsed per trip to the worker thread
+PARSE_BATCH_SIZE = 200
+# Row errors reported back; the import keeps going past them
+MAX_REPORTED_ERRORS = 100
+OPTION_KEYS = ("a", "b", "c", "d")
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def iter_rows(file, fmt: str) -> Iterator[dict]:
+    """Yield rows of a binary upload one at a time, as dicts."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+        return
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {line_no}: invalid JSON")
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_no}: expected a JSON object")
+        yield row
+
+
+async def aiter_rows(file, fmt: str) -> AsyncIterator[dict]:
+    """Yield the rows of iter_rows(), parsing them in batches off the event loop."""
+    rows = iter_rows(file, fmt)
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await loop.run_in_executor(None, lambda: list(islice(rows, PARSE_BATCH_SIZE)))
+        if not batch:
+            return
+        for row in batch:
+            yield row
+
+
+def _parse_datetime(value, default: datetime) -> datetime:
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return default
+
+
+def _parse_assignments(value) -> list:
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    # CSV cells list phones separated by ";" or ","
+    return [part.strip() for part in str(value).replace(";", ",").split(",") if part.strip()]
+
+
+def _parse_options(row: dict, answer: Optional[str]):
+    """Return (options dict, answer), accepting the same list format as create_exam."""
+    options = row.get("options")
+    if isinstance(options, str) and options:
+        options = json.loads(options)
+    if isinstance(options, list):
+        converted = {}
+        for idx, opt in enumerate(options):
+            key = chr(ord('a') + idx)
+            converted[key] = opt.get("text", "") if isinstance(opt, dict) else str(opt)
+            if isinstance(opt, dict) and opt.get("isCorrect"):
+                answer = key
+        return converted, answer
+    if isinstance(options, dict):
+        return options, answer
+    return {key: row[f"option_{key}"] for key in OPTION_KEYS if row.get(f"option_{key}")}, answer
+
+
+def _exam_doc(row: dict, creator_id) -> dict:
+    now = datetime.utcnow()
+    assigned_students = _parse_assignments(row.get("assigned_students"))
+    is_active = row.get("is_active", True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() not in ("false", "0", "no", "")
+    return {
+        "_id": ObjectId(),
+        "title": row.get("exam_title") or "Untitled Exam",
+        "subject": row.get("exam_subject") or "General",
+        "duration_minutes": int(row.get("duration_minutes") or 60),
+        "start_at": _parse_datetime(row.get("start_at"), now),
+        "end_at": _parse_datetime(row.get("end_at"), now + timedelta(days=7)),
+        "is_active": is_active,
+        "questions": [],
+        "assigned_students": assigned_students,
+        "assigned_students_normalized": normalize_assignments(assigned_students),
+        "creator_id": creator_id,
+        "submission_count": 0,
+    }
+
+
+def _question_doc(row: dict, exam_id: ObjectId, default_number: int) -> dict:
+    """Validate a row against the Question model and build the question document."""
+    q_type = row.get("type") or "MCQ"
+    answer = row.get("answer") or None
+    options, answer = _parse_options(row, answer)
+    if q_type == "MCQ" and answer:
+        answer = str(answer).strip().lower()
+    question = Question(
+        _id=ObjectId(),
+        number=row.get("number") or default_number,
+        exam_id=exam_id,
+        statement=row.get("statement") or row.get("questionText") or "",
+        media_url=row.get("media_url") or None,
+        type=q_type,
+        answer=answer,
+    )
+    doc = {
+        "_id": question.id,
+        "number": question.number,
+        "exam_id": exam_id,
+        "statement": question.statement,
+        "type": question.type,
+        "answer": question.answer,
+        "options": options,
+    }
+    if question.media_url:
+        doc["media_url"] = str(question.media_url)
+    return doc
+
+
+def _row_error(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(err["msg"] for err in exc.errors())
+    return str(exc)
+
+
+async def import_exams(rows: AsyncIterator[dict], creator_id) -> dict:
+    """
+    Import exams and their questions from rows.
+    Questions are inserted in unordered batches; exams are inserted once at the end.
+    Invalid rows and rejected inserts are reported and skipped.
+    """
+    exams = {}  # exam_title -> exam doc, in first-seen order
+    row_counts = {}  # exam_title -> rows seen, the default question number
+    batch = []  # (row_no, exam_title, question doc)
+    errors = []
+    error_count = 0
+
+    def report(row_no: int, message: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row_no, "error": message})
+
+    async def flush():
+        if not batch:
+            return
+        failed = set()
+        try:
+            await _db().questions.insert_many([doc for _, _, doc in batch], ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                failed.add(error["index"])
+                duplicate = error.get("code") == 11000
+                report(batch[error["index"]][0], "Duplicate question number for this exam" if duplicate else error.get("errmsg", "Insert failed"))
+        for idx, (_, title, doc) in enumerate(batch):
+            if idx not in failed:
+                exams[title]["questions"].append(doc["_id"])
+        batch.clear()
+
+    created = []
+    try:
+        row_no = 0
+        async for row in rows:
+            row_no += 1
+            title = row.get("exam_title") or "Untitled Exam"
+            row_counts[title] = row_counts.get(title, 0) + 1
+            try:
+                exam = exams.get(title)
+                if exam is None:
+                    exam = exams[title] = _exam_doc(row, creator_id)
+                doc = _question_doc(row, exam["_id"], row_counts[title])
+            except (ValidationError, ValueError, TypeError) as exc:
+                report(row_no, _row_error(exc))
+                continue
+            batch.append((row_no, title, doc))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+
+        created = [exam for exam in exams.values() if exam["questions"]]
+        for exam in created:
+            exam["questions_count"] = len(exam["questions"])
+        if created:
+            await _db().exams.insert_many(created)
+    except Exception:
+        # Don't leave questions behind for exams that were never written
+        exam_ids = [exam["_id"] for exam in exams.values()]
+        if exam_ids:
+            await _db().questions.delete_many({"exam_id": {"$in": exam_ids}})
+        raise
+
+    for exam in created:
+        invalidate_question_cache(exam["_id"])
+        invalidate_answer_key(exam["_id"])
+
+    return {
+        "exams": [
+            {"id": str(exam["_id"]), "title": exam["title"], "questions": exam["questions_count"]}
+            for exam in created
+        ],
+        "questions_imported": sum(exam["questions_count"] for exam in created),
+        "error_count": error_count,
+        "errors": sorted(errors, key=lambda error: error["row"]),
+    }
@@ -1,8 +1,23 @@
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
 import uuid
 from typing import List, Optional
 from bson import ObjectId
 import app.db.db as db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.log import get_logger, sampled
+from app.core.responses import dumps
+from app.services.answer_buffer import answer_buffer
+from app.services.session_registry import session_registry, SESSION_PROJECTION
+
+logger = get_logger(__name__)
+
+# exam_id -> (json_bytes, etag) of the answer-stripped question list
+_question_cache = TTLCache(maxsize=settings.QUESTION_CACHE_SIZE, ttl=settings.QUESTION_CACHE_TTL_SECONDS)
+# exam_id -> in-flight load, so a burst of cache misses hits the database once
+_question_loads: dict = {}
 
 
 def _db():
@@ -13,84 +28,136 @@ def _db():
 
 
 def serialize_doc(doc):
-    """Recursively convert ObjectIds in a document to strings."""
-    if doc is None:
-        return None
-    if isinstance(doc, ObjectId):
-        return str(doc)
-    if isinstance(doc, list):
-        return [serialize_doc(i) for i in doc]
+    """
+    Recursively convert ObjectIds in a document to strings, adding "id" next to every "_id".
+    Scalars are copied as-is without a recursive call.
+    """
     if isinstance(doc, dict):
         new_doc = {}
         for k, v in doc.items():
             if k == "_id":
-                new_doc[k] = str(v)
-                new_doc["id"] = str(v)
-            else:
+                new_doc[k] = new_doc["id"] = str(v)
+            elif isinstance(v, _NESTED_TYPES):
                 new_doc[k] = serialize_doc(v)
+            else:
+                new_doc[k] = v
         return new_doc
+    if isinstance(doc, list):
+        return [serialize_doc(i) if isinstance(i, _NESTED_TYPES) else i for i in doc]
+    if isinstance(doc, ObjectId):
+        return str(doc)
     return doc
 
 
+_NESTED_TYPES = (dict, list, ObjectId)
+
+
+def normalize_phone(value) -> str:
+    """Strip everything but digits so phones compare regardless of formatting."""
+    return "".join(filter(str.isdigit, str(value)))
+
+
+def normalize_assignments(assigned_students) -> list:
+    """Build the assigned_students_normalized list stored alongside assigned_students."""
+    return [normalize_phone(a) for a in assigned_students or []]
+
+
 async def get_active_exams(student_mobile: str = None, student_id: str = None):
-    """Fetch all active exams from the database."""
+    """
+    Fetch all active exams available to a student.
+    Assignment is matched in the query through the multikey assigned_students_normalized
+    index, and completion status comes from a single $in lookup on exam_sessions.
+    """
     now = datetime.utcnow()
     # Basic query for time-active and enabled exams
-    cursor = _db().exams.find({
+    query = {
         "is_active": True,
         "start_at": {"$lte": now},
         "end_at": {"$gte": now}
-    })
-    
+    }
+    sm = normalize_phone(student_mobile) if student_mobile else None
+    if sm is not None:
+        query["$or"] = [
+            {"assigned_students_normalized": sm},
+            {"assigned_students_normalized": {"$size": 0}},
+            # Exams written before the normalized field existed are checked below
+            {"assigned_students_normalized": {"$exists": False}},
+        ]
+
     exams = []
-    async for exam in cursor:
-        # Check assignment if student_mobile is provided
-        assigned = exam.get("assigned_students", [])
-        if assigned and student_mobile:
-            # Normalize for comparison: remove all non-digits
-            sm = "".join(filter(str.isdigit, str(student_mobile)))
-            as_normalized = ["".join(filter(str.isdigit, str(a))) for a in assigned]
-            if sm not in as_normalized:
+    async for exam in _db().exams.find(query):
+        if sm is not None and "assigned_students_normalized" not in exam:
+            assigned_normalized = normalize_assignments(exam.get("assigned_students"))
+            await _db().exams.update_one(
+                {"_id": exam["_id"]},
+                {"$set": {"assigned_students_normalized": assigned_normalized}}
+            )
+            if assigned_normalized and sm not in assigned_normalized:
                 continue
-        
-        exam_data = serialize_doc(exam)
-        
-        # Check if student completed it
-        if student_id:
-            session = await _db().exam_sessions.find_one({
+        exams.append(exam)
+
+    completed = {}
+    if student_id and exams:
+        cursor = _db().exam_sessions.find(
+            {
                 "student_id": ObjectId(student_id),
-                "exam_id": exam["_id"],
+                "exam_id": {"$in": [e["_id"] for e in exams]},
                 "status": "completed"
-            })
-            if session:
-                exam_data["is_completed"] = True
-                exam_data["completed_at"] = session.get("finished_at")
-        
-        exams.append(exam_data)
-    return exams
+            },
+            {"exam_id": 1, "finished_at": 1}
+        )
+        async for session in cursor:
+            completed[session["exam_id"]] = session
+
+    result = []
+    for exam in exams:
+        exam_data = serialize_doc(exam)
+        session = completed.get(exam["_id"])
+        if session:
+            exam_data["is_completed"] = True
+            exam_data["completed_at"] = session.get("finished_at")
+        result.append(exam_data)
+    return result
 
 
 async def get_all_exams():
-    """Fetch all exams (for admin/teacher view)."""
-    cursor = _db().exams.find({}).sort("created_at", -1)
-    exams = []
-    async for exam in cursor:
+    """
+    Fetch all exams (for admin/teacher view).
+    Submission and question counts are taken from the exam document when present,
+    otherwise they are resolved for all remaining exams with one grouped aggregation each.
+    """
+    exams = await _db().exams.find({}).sort("created_at", -1).to_list(length=None)
+
+    missing_submissions = [e["_id"] for e in exams if "submission_count" not in e]
+    missing_questions = [e["_id"] for e in exams if not e.get("questions_count")]
+
+    submission_counts = {}
+    if missing_submissions:
+        cursor = _db().exam_sessions.aggregate([
+            {"$match": {"exam_id": {"$in": missing_submissions}, "status": "completed"}},
+            {"$group": {"_id": "$exam_id", "count": {"$sum": 1}}}
+        ])
+        async for row in cursor:
+            submission_counts[row["_id"]] = row["count"]
+
+    question_counts = {}
+    if missing_questions:
+        cursor = _db().questions.aggregate([
+            {"$match": {"exam_id": {"$in": missing_questions}}},
+            {"$group": {"_id": "$exam_id", "count": {"$sum": 1}}}
+        ])
+        async for row in cursor:
+            question_counts[row["_id"]] = row["count"]
+
+    result = []
+    for exam in exams:
         exam_data = serialize_doc(exam)
-        
-        # Add submission count
-        count = await _db().exam_sessions.count_documents({
-            "exam_id": exam["_id"],
-            "status": "completed"
-        })
-        exam_data["submission_count"] = count
-        
-        # Also ensure questions count is present
+        if "submission_count" not in exam:
+            exam_data["submission_count"] = submission_counts.get(exam["_id"], 0)
         if not exam_data.get("questions_count"):
-            q_count = await _db().questions.count_documents({"exam_id": exam["_id"]})
-            exam_data["questions_count"] = q_count
-            
-        exams.append(exam_data)
-    return exams
+            exam_data["questions_count"] = question_counts.get(exam["_id"], 0)
+        result.append(exam_data)
+    return result
 
 
 async def get_exam_by_id(exam_id: str):
@@ -112,9 +179,51 @@ async def get_questions_for_exam(exam_id: str):
     return questions
 
 
+async def get_questions_payload(exam_id: str) -> tuple:
+    """
+    Return (json_bytes, etag) for an exam's answer-stripped question list.
+    Payloads are served from an in-process LRU/TTL cache; concurrent misses share one load.
+    """
+    cached = _question_cache.get(exam_id)
+    if cached is not None:
+        return cached
+
+    load = _question_loads.get(exam_id)
+    if load is None:
+        load = asyncio.ensure_future(_load_questions_payload(exam_id))
+        _question_loads[exam_id] = load
+        load.add_done_callback(lambda fut: _finish_questions_load(exam_id, fut))
+    # Shielded so one disconnecting client does not cancel the load for everyone else
+    return await asyncio.shield(load)
+
+
+def _finish_questions_load(exam_id: str, fut) -> None:
+    # Only cache the result if no invalidation happened while the load was running
+    if _question_loads.get(exam_id) is fut:
+        del _question_loads[exam_id]
+        if not fut.cancelled() and fut.exception() is None:
+            _question_cache.set(exam_id, fut.result())
+
+
+async def _load_questions_payload(exam_id: str) -> tuple:
+    questions = await get_questions_for_exam(exam_id)
+    body = dumps(questions)
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, etag
+
+
+
+def invalidate_question_cache(exam_id) -> None:
+    """Drop the cached question payload for an exam after its questions change."""
+    exam_id = str(exam_id)
+    _question_cache.pop(exam_id)
+    # A load that started before the write must not repopulate the cache
+    _question_loads.pop(exam_id, None)
+
+
 async def start_exam_session(student_id: str, exam_id: str):
     """Initialize a new exam session for a student."""
-    print(f"DEBUG: Starting session for student_id={student_id}, exam_id={exam_id}")
+    logger.debug("Starting session", extra={"student_id": student_id, "exam_id": exam_id})
     
     # Try to find user by ID or mobile phone to get the real ObjectId
     user = None
@@ -130,7 +239,7 @@ async def start_exam_session(student_id: str, exam_id: str):
         user = await _db().users.find_one({"mobile_phone": student_id})
         
     if not user:
-        print(f"DEBUG: User not found for student_id={student_id}")
+        logger.debug("User not found", extra={"student_id": student_id})
         raise ValueError(f"Student not found: {student_id}")
         
     actual_student_id = user["_id"]
@@ -144,13 +253,13 @@ async def start_exam_session(student_id: str, exam_id: str):
     assigned_students = exam.get("assigned_students", [])
     if assigned_students:
         # Normalize for comparison
-        clean_phone = "".join(filter(str.isdigit, str(student_phone)))
-        assigned_normalized = ["".join(filter(str.isdigit, str(a))) for a in assigned_students]
+        clean_phone = normalize_phone(student_phone)
+        assigned_normalized = exam.get("assigned_students_normalized") or normalize_assignments(assigned_students)
         
         assigned_by_id = [str(a) for a in assigned_students]
         
         if str(actual_student_id) not in assigned_by_id and clean_phone not in assigned_normalized:
-            print(f"DEBUG: Assignment check failed for {clean_phone}")
+            logger.debug("Assignment check failed", extra={"student_id": str(actual_student_id), "exam_id": exam_id})
             raise ValueError("You are not assigned to this exam")
         
     # Check if student already has any session for this exam
@@ -162,6 +271,11 @@ async def start_exam_session(student_id: str, exam_id: str):
     if session:
         if session["status"] == "completed":
             raise ValueError("You have already completed this exam")
+        # Expired sessions are returned for display but never accept answers again
+        if session["status"] == "active":
+            session_registry.add(session["session_token"], session)
+        # Include answers that are accepted but still waiting in the write-behind buffer
+        session["responses"] = {**session.get("responses", {}), **answer_buffer.pending_for(session["_id"])}
         session["id"] = str(session["_id"])
         session["token"] = session.get("session_token")
         return serialize_doc(session)
@@ -182,46 +296,78 @@ async def start_exam_session(student_id: str, exam_id: str):
     }
     
     result = await _db().exam_sessions.insert_one(session_doc)
+    session_registry.add(session_doc["session_token"], session_doc)
     session_doc["id"] = str(result.inserted_id)
     session_doc["token"] = session_doc["session_token"]
     return serialize_doc(session_doc)
 
 
+async def _get_active_session(session_token: str):
+    """Resolve an active session by token from the session registry, loading it on a miss."""
+    record = session_registry.get(session_token)
+    if record is None:
+        doc = await _db().exam_sessions.find_one(
+            {"session_token": session_token, "status": "active"},
+            SESSION_PROJECTION
+        )
+        if doc:
+            record = session_registry.add(session_token, doc)
+    if record is None or record.status != "active":
+        return None
+    return record
+
+
+async def _expire_session(session_token: str, record) -> None:
+    session_registry.evict(session_token)
+    record.status = "expired"
+    # Answers accepted before expiry must land before the status change
+    await answer_buffer.flush_session(record.session_id)
+    await _db().exam_sessions.update_one(
+        {"_id": record.session_id},
+        {"$set": {"status": "expired"}}
+    )
+
+
 async def submit_question_answer(session_token: str, question_id: str, answer_text: str):
-    """Submit or update an answer for a specific question in a session."""
-    session = await _db().exam_sessions.find_one({"session_token": session_token, "status": "active"})
+    """
+    Submit or update an answer for a specific question in a session.
+    The answer is journaled and buffered; it reaches the database on the next flush.
+    """
+    session = await _get_active_session(session_token)
     if not session:
         raise ValueError("Invalid or inactive session")
         
-    if datetime.utcnow() > session["expires_at"]:
-        await _db().exam_sessions.update_one(
-            {"_id": session["_id"]},
-            {"$set": {"status": "expired"}}
-        )
+    if session.is_expired():
+        await _expire_session(session_token, session)
         raise ValueError("Session expired")
         
-    update_query = {f"responses.{question_id}": answer_text}
-    await _db().exam_sessions.update_one(
-        {"_id": session["_id"]},
-        {"$set": update_query}
-    )
+    answer_buffer.record(session.session_id, question_id, answer_text)
+    if sampled(settings.LOG_ANSWER_SAMPLE_RATE):
+        logger.debug("Answer accepted", extra={"session_id": str(session.session_id), "question_id": question_id})
     return {"success": True}
 
 
 async def complete_exam_session(session_token: str):
     """Mark an exam session as completed and calculate the score."""
     from app.services.report_service import calculate_score
+    from app.services.analytics_service import record_completion
 
-    session = await _db().exam_sessions.find_one({"session_token": session_token, "status": "active"})
+    session = await _get_active_session(session_token)
     if not session:
         # Check if already completed
-        session = await _db().exam_sessions.find_one({"session_token": session_token, "status": "completed"})
-        if session:
-            return {"success": True, "message": "Already completed", "session_id": str(session["_id"])}
+        completed = await _db().exam_sessions.find_one(
+            {"session_token": session_token, "status": "completed"},
+            {"_id": 1}
+        )
+        if completed:
+            return {"success": True, "message": "Already completed", "session_id": str(completed["_id"])}
         raise ValueError("Invalid or inactive session")
-        
-    await _db().exam_sessions.update_one(
-        {"_id": session["_id"]},
+
+    session_registry.evict(session_token)
+    session.status = "completed"
+    await answer_buffer.flush_session(session.session_id)
+    result = await _db().exam_sessions.update_one(
+        {"_id": session.session_id, "status": "active"},
         {
             "$set": {
                 "status": "completed",
@@ -230,10 +376,20 @@ async def complete_exam_session(session_token: str):
         }
     )
 
+    # Only the request that actually completed the session bumps the counter.
+    # Exams created before the counter existed are left to the aggregation in get_all_exams.
+    if result.modified_count:
+        await _db().exams.update_one(
+            {"_id": session.exam_id, "submission_count": {"$exists": True}},
+            {"$inc": {"submission_count": 1}}
+        )
+
     # Calculate score immediately
     try:
-        await calculate_score(str(session["_id"]))
-    except Exception as e:
-        print(f"Error calculating score: {e}")
+        report = await calculate_score(str(session.session_id))
+        if result.modified_count:
+            await record_completion(session.session_id, report["score"])
+    except Exception:
+        logger.exception("Error calculating score for session %s", session.session_id)
         
-    return {"success": True, "session_id": str(session["_id"])}
+    return {"success": True, "session_id": str(session.session_id)}
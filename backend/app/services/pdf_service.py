@@ -0,0 +1,269 @@
+"""PDF report rendering in worker processes, with a size-bounded disk cache.
+
+Rendered reports are stored as <session_id>-v<report version>.pdf. A re-score
+bumps the report version, so a changed report gets a new file and ETag, and
+stale files age out of the cache.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import app.db.db as db
+from app.core.config import settings
+PDF_CACHE_DIR = settings.PDF_CACHE_DIR or os.path.abspath(os.path.join(os.path.dirname(db.__file__), "pdf_cache"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# cache file name -> size in bytes, oldest use first
+_cache_index: Optional[dict] = None
+_cache_bytes = 0
+# cache file name -> in-flight render, so concurrent downloads render once
+_renders: dict = {}
+# cache file name -> responses still sending it; these are never evicted
+_in_use: dict = {}
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def render_report_pdf(data: dict) -> bytes:
+    """Build the report PDF from plain report data. Runs in a worker process."""
+    from io import BytesIO
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # Header
+    elements.append(Paragraph("Online Assessment Platform", styles['Title']))
+    elements.append(Paragraph("Exam Performance Report", styles['Heading1']))
+    elements.append(Spacer(1, 12))
+
+    # Student Info
+    student_data = [
+        ["Student Name:", data["student_name"]],
+        ["Student ID:", data["student_id"]],
+        ["Mobile Phone:", data["mobile_phone"]],
+        ["Exam Subject:", data["exam_title"]],
+        ["Completed At:", data["completed_at"]]
+    ]
+
+    table = Table(student_data, colWidths=[120, 300])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 24))
+
+    # Results
+    score_style = ParagraphStyle('ScoreStyle', parent=styles['Normal'], fontSize=24, leading=30, alignment=1)
+    elements.append(Paragraph(f"Score: {data['score']} / {data['total']}", score_style))
+    elements.append(Paragraph(f"Percentage: {round(data['percentage'])}%", score_style))
+    elements.append(Spacer(1, 24))
+
+    # Footer
+    elements.append(Spacer(1, 48))
+    elements.append(Paragraph("This is a system-generated report.", styles['Italic']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def build_report_data(report: dict, student: dict, exam: dict) -> dict:
+    """Plain, picklable fields the PDF needs, from the report, user and exam documents."""
+    return {
+        "student_name": f"{student.get('name')} {student.get('surname')}",
+        "student_id": str(student.get('_id')),
+        "mobile_phone": student.get('mobile_phone'),
+        "exam_title": exam.get('title', 'N/A'),
+        "completed_at": report.get('created_at').strftime("%Y-%m-%d %H:%M:%S"),
+        "score": report['score'],
+        "total": report['total'],
+        "percentage": report['percentage'],
+    }
+
+
+def report_version(report: dict) -> int:
+    # Reports written before versioning count as version 0
+    return report.get("version", 0)
+
+
+def report_etag(session_id, report: dict) -> str:
+    return f'"{session_id}-v{report_version(report)}"'
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the server process runs threads (driver, logging, password pool)
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def render_pdf(data: dict) -> bytes:
+    """Render a report PDF in the worker process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), render_report_pdf, data)
+
+
+def shutdown() -> None:
+    """Stop the worker processes."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _load_cache_index() -> dict:
+    global _cache_index, _cache_bytes
+    if _cache_index is None:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        entries = []
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        _cache_index = {name: size for _, name, size in entries}
+        _cache_bytes = sum(_cache_index.values())
+    return _cache_index
+
+
+def _cache_hit(name: str) -> Optional[str]:
+    index = _load_cache_index()
+    path = os.path.join(PDF_CACHE_DIR, name)
+    if name not in index:
+        return None
+    if not os.path.exists(path):
+        _forget(name)
+        return None
+    # Move to the most recently used end
+    index[name] = index.pop(name)
+    return path
+
+
+def _forget(name: str) -> None:
+    global _cache_bytes
+    size = _cache_index.pop(name, None)
+    if size is not None:
+        _cache_bytes -= size
+
+
+def _write_file(path: str, content: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _register(name: str, size: int) -> None:
+    """Account for a new cache file and evict the least recently used files over the limit."""
+    global _cache_bytes
+    index = _load_cache_index()
+    _forget(name)
+    index[name] = size
+    _cache_bytes += size
+
+    for oldest in [cached for cached in index if cached not in _in_use]:
+        if _cache_bytes <= settings.PDF_CACHE_MAX_BYTES or len(index) <= 1:
+            break
+        _forget(oldest)
+        try:
+            os.remove(os.path.join(PDF_CACHE_DIR, oldest))
+        except FileNotFoundError:
+            pass
+
+
+def _cache_name(session_id, report: dict) -> str:
+    return f"{session_id}-v{report_version(report)}.pdf"
+
+
+def cached_path(session_id, report: dict) -> Optional[str]:
+    """Path of the cached PDF for a report version, or None if it is not cached."""
+    return _cache_hit(_cache_name(session_id, report))
+
+
+def release_pdf(path: str) -> None:
+    """Allow a PDF returned by cached_report_pdf to be evicted again once it has been sent."""
+    name = os.path.basename(path)
+    count = _in_use.pop(name, 0) - 1
+    if count > 0:
+        _in_use[name] = count
+
+
+async def cached_report_pdf(session_id, report: dict, load_data) -> str:
+    """
+    Return the path of the cached PDF for a report version, rendering it on a miss.
+    load_data is an async callable returning the build_report_data() dict to render.
+    The file is kept in the cache until the caller passes the path to release_pdf.
+    """
+    name = _cache_name(session_id, report)
+    while True:
+        path = _cache_hit(name)
+        if path is not None:
+            _in_use[name] = _in_use.get(name, 0) + 1
+            return path
+
+        # Another render may evict this one before we resume, hence the loop
+        render = _renders.get(name)
+        if render is None:
+            render = asyncio.ensure_future(_render_to_cache(name, load_data))
+            _renders[name] = render
+            render.add_done_callback(lambda _: _renders.pop(name, None))
+        await asyncio.shield(render)
+
+
+async def _render_to_cache(name: str, load_data) -> str:
+    content = await render_pdf(await load_data())
+    _load_cache_index()
+    path = os.path.join(PDF_CACHE_DIR, name)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _write_file, path, content)
+    _register(name, len(content))
+    return path
+
+
+async def get_report_pdf(session_id: str, if_none_match: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """
+    Return (path, etag) of a session's report PDF, scoring the session first if needed.
+    path is None when if_none_match already names the current version; otherwise
+    it must be passed to release_pdf once the file has been sent.
+    """
+    from app.services.report_service import get_session_by_id, get_report_by_session, calculate_score
+    from app.clients.user_client import find_user_by_id
+
+    session = await get_session_by_id(session_id)
+    if not session:
+        raise ValueError("Session not found")
+
+    report = await get_report_by_session(session_id)
+    if not report:
+        report = await calculate_score(session_id)
+
+    etag = report_etag(session["_id"], report)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return None, etag
+
+    async def load_data():
+        student = await find_user_by_id(str(session["student_id"]))
+        exam = await _db().exams.find_one({"_id": session["exam_id"]}, {"title": 1})
+        return build_report_data(report, student, exam)
+
+    return await cached_report_pdf(session["_id"], report, load_data), etag
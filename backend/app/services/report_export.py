@@ -0,0 +1,211 @@
+"""Background export of all report PDFs of an exam into one ZIP file.
+
+Sessions, reports, students and the exam are prefetched with one query per
+collection. PDFs are rendered by the pdf_service worker pool with a bounded
+number in flight, and each one is appended to a ZIP on disk as soon as it is
+ready, so memory use does not grow with the class size.
+"""
+import asyncio
+import os
+import re
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+from bson import ObjectId
+import app.db.db as db
+from app.core.config import settings
+from app.core.log import get_logger
+from app.services import pdf_service
+from app.services.report_service import calculate_score
+
+logger = get_logger(__name__)
+
+EXPORT_DIR = settings.REPORT_EXPORT_DIR or os.path.abspath(os.path.join(os.path.dirname(db.__file__), "report_exports"))
+# Finished exports are kept for download, oldest dropped (and deleted) first
+MAX_TRACKED_JOBS = 20
+
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_tasks: dict = {}
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def _public(job: dict) -> dict:
+    """Job state as returned by the API, with live throughput for running jobs."""
+    data = {key: value for key, value in job.items() if not key.startswith("_")}
+    elapsed = (job["_finished_monotonic"] or time.monotonic()) - job["_started_monotonic"]
+    data["elapsed_seconds"] = round(elapsed, 3)
+    data["reports_per_second"] = round(job["processed"] / elapsed, 1) if elapsed > 0 else 0.0
+    return data
+
+
+def get_export_job(job_id: str) -> Optional[dict]:
+    """Return the progress of an export job, or None if it is unknown."""
+    job = _jobs.get(job_id)
+    return _public(job) if job else None
+
+
+def get_export_file(job_id: str) -> Optional[dict]:
+    """Return the ZIP path and download name of a completed export, or None if it is unknown."""
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    if job["status"] != "completed":
+        raise ValueError(f"Export is {job['status']}")
+    return {"path": job["_path"], "filename": job["filename"]}
+
+
+def _drop_old_jobs() -> None:
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if oldest["status"] in ("pending", "running"):
+            break
+        del _jobs[oldest_id]
+        try:
+            os.remove(oldest["_path"])
+        except FileNotFoundError:
+            pass
+
+
+async def start_export_job(exam_id: str, student_ids: Optional[List[str]] = None) -> dict:
+    """
+    Start exporting the report PDFs of an exam's completed sessions, optionally
+    limited to some students. Returns the initial job state; poll get_export_job for progress.
+    """
+    exam_oid = ObjectId(exam_id)
+    exam = await _db().exams.find_one({"_id": exam_oid}, {"title": 1})
+    if not exam:
+        raise ValueError("Exam not found")
+
+    query = {"exam_id": exam_oid, "status": "completed"}
+    if student_ids:
+        query["student_id"] = {"$in": [ObjectId(sid) for sid in student_ids]}
+
+    job_id = uuid.uuid4().hex
+    title = re.sub(r"[^A-Za-z0-9_-]+", "_", exam.get("title") or "Exam").strip("_") or "Exam"
+    job = {
+        "id": job_id,
+        "exam_id": exam_id,
+        "status": "pending",
+        "total": await _db().exam_sessions.count_documents(query),
+        "processed": 0,
+        "failed": 0,
+        "filename": f"Reports_{title}.zip",
+        "error": None,
+        "started_at": datetime.utcnow(),
+        "finished_at": None,
+        "_path": os.path.join(EXPORT_DIR, f"{job_id}.zip"),
+        "_started_monotonic": time.monotonic(),
+        "_finished_monotonic": None,
+    }
+    _jobs[job_id] = job
+    _drop_old_jobs()
+
+    task = asyncio.create_task(_run_export(job, exam, query))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+    return _public(job)
+
+
+async def _prefetch(exam: dict, query: dict) -> list:
+    """Return (session, report, student) for every matching session, one query per collection."""
+    sessions = [
+        session async for session in _db().exam_sessions.find(
+            query, {"_id": 1, "student_id": 1}
+        ).sort("_id", 1)
+    ]
+    session_ids = [session["_id"] for session in sessions]
+    reports = {
+        report["session_id"]: report
+        async for report in _db().reports.find({"session_id": {"$in": session_ids}})
+    }
+    # Completed sessions nobody opened a report for yet are scored now
+    for session in sessions:
+        if session["_id"] not in reports:
+            reports[session["_id"]] = await calculate_score(str(session["_id"]))
+
+    student_ids = list({session["student_id"] for session in sessions})
+    students = {
+        student["_id"]: student
+        async for student in _db().users.find(
+            {"_id": {"$in": student_ids}}, {"name": 1, "surname": 1, "mobile_phone": 1}
+        )
+    }
+    return [
+        (session, reports[session["_id"]], students.get(session["student_id"], {"_id": session["student_id"]}))
+        for session in sessions
+    ]
+
+
+def _entry_name(student: dict, session_id) -> str:
+    name = f"{student.get('surname') or ''}_{student.get('name') or ''}".strip("_") or "Student"
+    return f"{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}_{session_id}.pdf"
+
+
+async def _report_pdf(session_id, report: dict, data: dict) -> bytes:
+    """
+    Reuse a PDF already in the download cache, otherwise render one in the pool.
+    Fresh renders are not added to the cache, so one large export does not evict
+    the reports students are downloading individually.
+    """
+    path = pdf_service.cached_path(session_id, report)
+    if path is not None:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+    return await pdf_service.render_pdf(data)
+
+
+async def _run_export(job: dict, exam: dict, query: dict) -> None:
+    job["status"] = "running"
+    loop = asyncio.get_running_loop()
+    archive = None
+    try:
+        rows = await _prefetch(exam, query)
+        job["total"] = len(rows)
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        # PDFs are already compressed; storing them keeps the ZIP writer cheap
+        archive = zipfile.ZipFile(job["_path"], "w", compression=zipfile.ZIP_STORED)
+        write_lock = asyncio.Lock()
+        # Enough in flight to keep every worker busy without buffering the whole class
+        limit = asyncio.Semaphore(settings.PDF_WORKERS * 2)
+
+        async def export_one(session, report, student):
+            async with limit:
+                try:
+                    data = pdf_service.build_report_data(report, student, exam)
+                    content = await _report_pdf(session["_id"], report, data)
+                except Exception:
+                    job["failed"] += 1
+                    logger.exception("Error rendering report for session %s", session["_id"])
+                    return
+                async with write_lock:
+                    await loop.run_in_executor(None, archive.writestr, _entry_name(student, session["_id"]), content)
+                job["processed"] += 1
+
+        await asyncio.gather(*(export_one(*row) for row in rows))
+        archive.close()
+        archive = None
+        job["status"] = "completed"
+    except Exception as exc:
+        job["status"] = "failed"
+        job["error"] = str(exc)
+        logger.exception("Error exporting reports for exam %s", job["exam_id"])
+    finally:
+        if archive is not None:
+            archive.close()
+        if job["status"] == "failed" and os.path.exists(job["_path"]):
+            os.remove(job["_path"])
+        job["finished_at"] = datetime.utcnow()
+        job["_finished_monotonic"] = time.monotonic()
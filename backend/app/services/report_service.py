@@ -1,6 +1,16 @@
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import app.db.db as db
 from datetime import datetime
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.scoring import get_answer_key
+
+# session_id (str) -> report of a completed session; dropped whenever it is re-scored
+_reports = TTLCache(maxsize=settings.REPORT_CACHE_SIZE, ttl=settings.REPORT_CACHE_TTL_SECONDS)
+# session token or id (str) -> session_id (str) of a completed session
+_session_ids = TTLCache(maxsize=settings.REPORT_CACHE_SIZE, ttl=settings.REPORT_CACHE_TTL_SECONDS)
 
 def _db():
     """Always return the current live database object."""
@@ -18,122 +28,131 @@ async def get_session_by_id(session_id: str):
 async def calculate_score(session_id: str):
     """
     Calculate the score for a completed exam session.
-    Compares responses in the session with the correct answers in the questions collection.
+    Compares responses in the session with the exam's cached, compiled answer key
+    and upserts the session's report, so repeated calls never create duplicates.
     """
     session = await get_session_by_id(session_id)
     if not session:
         raise ValueError("Session not found")
         
-    responses = session.get("responses", {})
-    correct_count = 0
-    total_questions = 0
-    
-    print(f"DEBUG SCORING: session_id={session_id}")
-    print(f"DEBUG SCORING: responses stored = {responses}")
+    key = await get_answer_key(session["exam_id"])
+    correct_count = key.score(session.get("responses", {}))
+    total_questions = key.total
+    score_percentage = key.percentage(correct_count)
     
-    # Get all questions for this exam to compare answers
-    cursor = _db().questions.find({"exam_id": session["exam_id"]})
-    async for question in cursor:
-        total_questions += 1
-        q_id = str(question["_id"])
-        correct_answer = question.get("answer", "").strip().lower()
-        student_answer = responses.get(q_id, "")
-        
-        if student_answer:
-            student_answer = str(student_answer).strip().lower()
-        
-        is_correct = bool(student_answer and correct_answer and student_answer == correct_answer)
-        
-        print(f"DEBUG SCORING: Q={q_id} | correct={correct_answer!r} | student={student_answer!r} | match={is_correct}")
-        
-        if is_correct:
-            correct_count += 1
-            
-    score_percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
-    
-    print(f"DEBUG SCORING: Result = {correct_count}/{total_questions} = {score_percentage:.1f}%")
-    
-    report_doc = {
-        "student_id": session["student_id"],
-        "exam_id": session["exam_id"],
-        "session_id": session["_id"],
-        "score": correct_count,
-        "total": total_questions,
-        "percentage": score_percentage,
-        "created_at": datetime.utcnow()
+    now = datetime.utcnow()
+    update = {
+        "$set": {
+            "student_id": session["student_id"],
+            "exam_id": session["exam_id"],
+            "score": correct_count,
+            "total": total_questions,
+            "percentage": score_percentage,
+            "updated_at": now
+        },
+        "$setOnInsert": {"created_at": now},
+        # Cached PDFs are keyed by version, so every re-score invalidates them
+        "$inc": {"version": 1}
     }
-    
-    result = await _db().reports.insert_one(report_doc)
-    report_doc["id"] = str(result.inserted_id)
+    try:
+        report_doc = await _db().reports.find_one_and_update(
+            {"session_id": session["_id"]}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent upsert inserted the report first; this one now matches it
+        report_doc = await _db().reports.find_one_and_update(
+            {"session_id": session["_id"]}, update, return_document=ReturnDocument.AFTER
+        )
+    invalidate_report(session["_id"])
+    report_doc["id"] = str(report_doc["_id"])
     
     return report_doc
 
-async def generate_pdf_report(session_id: str):
+def invalidate_report(session_id) -> None:
+    """Drop a session's cached report after it is (re-)scored."""
+    _reports.pop(str(session_id))
+
+async def find_session(session_token_or_id: str, projection: dict = None):
+    """Fetch an exam session by its token or ObjectId with one query."""
+    if ObjectId.is_valid(session_token_or_id):
+        query = {"$or": [{"session_token": session_token_or_id}, {"_id": ObjectId(session_token_or_id)}]}
+    else:
+        query = {"session_token": session_token_or_id}
+    return await _db().exam_sessions.find_one(query, projection)
+
+async def get_session_report(session_token_or_id: str):
     """
-    Generate a server-side PDF report for an exam session.
+    Return the report of a session given its token or id, scoring it on first access.
+    Reports of completed sessions are cached until the session is re-scored.
     """
-    from io import BytesIO
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from app.clients.user_client import find_user_by_id
+    session_id = _session_ids.get(session_token_or_id)
+    if session_id is not None:
+        report = _reports.get(session_id)
+        if report is not None:
+            return report
 
-    session = await get_session_by_id(session_id)
+    session = await find_session(session_token_or_id, {"_id": 1, "status": 1})
     if not session:
         raise ValueError("Session not found")
-        
+    session_id = str(session["_id"])
+
     report = await get_report_by_session(session_id)
     if not report:
         report = await calculate_score(session_id)
-        
-    student = await find_user_by_id(str(session["student_id"]))
-    exam = await _db().exams.find_one({"_id": session["exam_id"]})
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
-    
-    # Header
-    elements.append(Paragraph("Online Assessment Platform", styles['Title']))
-    elements.append(Paragraph("Exam Performance Report", styles['Heading1']))
-    elements.append(Spacer(1, 12))
-    
-    # Student Info
-    student_data = [
-        ["Student Name:", f"{student.get('name')} {student.get('surname')}"],
-        ["Student ID:", str(student.get('_id'))],
-        ["Mobile Phone:", student.get('mobile_phone')],
-        ["Exam Subject:", exam.get('title', 'N/A')],
-        ["Completed At:", report.get('created_at').strftime("%Y-%m-%d %H:%M:%S")]
-    ]
-    
-    table = Table(student_data, colWidths=[120, 300])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 24))
-    
-    # Results
-    score_style = ParagraphStyle('ScoreStyle', parent=styles['Normal'], fontSize=24, leading=30, alignment=1)
-    elements.append(Paragraph(f"Score: {report['score']} / {report['total']}", score_style))
-    elements.append(Paragraph(f"Percentage: {round(report['percentage'])}%", score_style))
-    elements.append(Spacer(1, 24))
-    
-    # Footer
-    elements.append(Spacer(1, 48))
-    elements.append(Paragraph("This is a system-generated report.", styles['Italic']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+
+    if session.get("status") == "completed":
+        _session_ids.set(session_token_or_id, session_id)
+        _reports.set(session_id, report)
+    return report
+
+async def enrich_reports(reports: list) -> list:
+    """
+    Attach student and exam display fields to a batch of report documents.
+    Resolves all referenced users and exams with one $in query per collection.
+    """
+    student_ids = list({r["student_id"] for r in reports if r.get("student_id") is not None})
+    exam_ids = list({r["exam_id"] for r in reports if r.get("exam_id") is not None})
+
+    students = {}
+    if student_ids:
+        cursor = _db().users.find(
+            {"_id": {"$in": student_ids}},
+            {"name": 1, "surname": 1, "mobile_phone": 1}
+        )
+        async for student in cursor:
+            students[student["_id"]] = student
+
+    exams = {}
+    if exam_ids:
+        cursor = _db().exams.find({"_id": {"$in": exam_ids}}, {"title": 1, "subject": 1})
+        async for exam in cursor:
+            exams[exam["_id"]] = exam
+
+    enriched = []
+    for report in reports:
+        report_data = {
+            "id": str(report["_id"]),
+            "student_id": str(report.get("student_id", "")),
+            "exam_id": str(report.get("exam_id", "")),
+            "session_id": str(report.get("session_id", "")),
+            "score": report.get("score", 0),
+            "total": report.get("total", 0),
+            "percentage": report.get("percentage", 0),
+            "created_at": report.get("created_at"),
+        }
+
+        student = students.get(report.get("student_id"))
+        if student:
+            report_data["student_name"] = f"{student.get('name', '')} {student.get('surname', '')}".strip()
+            report_data["student_phone"] = student.get("mobile_phone", "")
+
+        exam = exams.get(report.get("exam_id"))
+        if exam:
+            report_data["exam_title"] = exam.get("title", "Unknown Exam")
+            report_data["exam_subject"] = exam.get("subject", "")
+
+        enriched.append(report_data)
+    return enriched
 
 async def get_report_by_session(session_id: str):
     """Retrieve an existing report for a session."""
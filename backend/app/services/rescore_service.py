@@ -0,0 +1,186 @@
+"""Background re-scoring of every completed session of an exam."""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+import app.db.db as db
+from app.services.scoring import get_answer_key, invalidate_answer_key
+from app.services.analytics_service import rebuild_exam_analytics
+from app.services.report_service import invalidate_report
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+RESCORE_BATCH_SIZE = 1000
+# Finished jobs are kept for status polling, oldest dropped first
+MAX_TRACKED_JOBS = 50
+
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_tasks: dict = {}
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def _public(job: dict) -> dict:
+    """Job state as returned by the API, with live throughput for running jobs."""
+    data = dict(job)
+    started = data.pop("_started_monotonic")
+    finished = data.pop("_finished_monotonic")
+    elapsed = (finished or time.monotonic()) - started
+    data["elapsed_seconds"] = round(elapsed, 3)
+    data["sessions_per_second"] = round(data["processed"] / elapsed, 1) if elapsed > 0 else 0.0
+    return data
+
+
+def get_rescore_job(job_id: str) -> Optional[dict]:
+    """Return the progress of a re-scoring job, or None if it is unknown."""
+    job = _jobs.get(job_id)
+    return _public(job) if job else None
+
+
+async def start_rescore_job(exam_id: str) -> dict:
+    """
+    Start re-scoring all completed sessions of an exam in the background.
+    Returns the initial job state; poll get_rescore_job for progress.
+    """
+    exam_oid = ObjectId(exam_id)
+    exam = await _db().exams.find_one({"_id": exam_oid}, {"_id": 1})
+    if not exam:
+        raise ValueError("Exam not found")
+
+    # No await between this check and registering the job, so concurrent requests share one job
+    for job in _jobs.values():
+        if job["exam_id"] == exam_id and job["status"] in ("pending", "running"):
+            return _public(job)
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "exam_id": exam_id,
+        "status": "pending",
+        "total": None,
+        "processed": 0,
+        "batches": 0,
+        "error": None,
+        "started_at": datetime.utcnow(),
+        "finished_at": None,
+        "_started_monotonic": time.monotonic(),
+        "_finished_monotonic": None,
+    }
+    _jobs[job_id] = job
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if oldest["status"] in ("pending", "running"):
+            break
+        del _jobs[oldest_id]
+
+    try:
+        job["total"] = await _db().exam_sessions.count_documents({"exam_id": exam_oid, "status": "completed"})
+    except Exception as exc:
+        job["status"] = "failed"
+        job["error"] = str(exc)
+        job["finished_at"] = datetime.utcnow()
+        job["_finished_monotonic"] = time.monotonic()
+        raise
+    task = asyncio.create_task(_run_rescore(job, exam_oid))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+    return _public(job)
+
+
+async def rescore_exam(exam_oid: ObjectId, job: Optional[dict] = None) -> int:
+    """
+    Re-score every completed session of an exam in streaming batches,
+    upserting one report per session_id with bulk_write, then rebuild the exam's statistics.
+    Returns the number of sessions scored.
+    """
+    # Always recompile, the answer key is usually what just changed
+    invalidate_answer_key(exam_oid)
+    key = await get_answer_key(exam_oid)
+
+    processed = 0
+    batch = []
+    cursor = _db().exam_sessions.find(
+        {"exam_id": exam_oid, "status": "completed"},
+        {"_id": 1, "student_id": 1, "responses": 1},
+        batch_size=RESCORE_BATCH_SIZE
+    )
+    async for session in cursor:
+        batch.append(session)
+        if len(batch) >= RESCORE_BATCH_SIZE:
+            processed += await _write_scores(key, batch)
+            batch = []
+            if job is not None:
+                job["processed"] = processed
+                job["batches"] += 1
+    if batch:
+        processed += await _write_scores(key, batch)
+        if job is not None:
+            job["processed"] = processed
+            job["batches"] += 1
+    await rebuild_exam_analytics(exam_oid)
+    return processed
+
+
+async def _write_scores(key, sessions: list) -> int:
+    now = datetime.utcnow()
+    scores = key.score_many(s.get("responses") or {} for s in sessions)
+    # Only reports whose result actually changed are rewritten (and get a new version)
+    current = {
+        report["session_id"]: (report.get("score"), report.get("total"))
+        async for report in _db().reports.find(
+            {"session_id": {"$in": [s["_id"] for s in sessions]}},
+            {"session_id": 1, "score": 1, "total": 1}
+        )
+    }
+    changed = [
+        (session, score) for session, score in zip(sessions, scores)
+        if current.get(session["_id"]) != (score, key.total)
+    ]
+    operations = [
+        UpdateOne(
+            {"session_id": session["_id"]},
+            {
+                "$set": {
+                    "student_id": session.get("student_id"),
+                    "exam_id": key.exam_id,
+                    "score": score,
+                    "total": key.total,
+                    "percentage": key.percentage(score),
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now},
+                "$inc": {"version": 1}
+            },
+            upsert=True
+        )
+        for session, score in changed
+    ]
+    if operations:
+        await _db().reports.bulk_write(operations, ordered=False)
+        for session, _ in changed:
+            invalidate_report(session["_id"])
+    return len(sessions)
+
+
+async def _run_rescore(job: dict, exam_oid: ObjectId) -> None:
+    job["status"] = "running"
+    try:
+        await rescore_exam(exam_oid, job)
+        job["status"] = "completed"
+    except Exception as exc:
+        job["status"] = "failed"
+        job["error"] = str(exc)
+        logger.exception("Error re-scoring exam %s", exam_oid)
+    finally:
+        job["finished_at"] = datetime.utcnow()
+        job["_finished_monotonic"] = time.monotonic()
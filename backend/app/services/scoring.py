@@ -0,0 +1,94 @@
+"""Scoring engine: compiled, cached answer keys and batched session scoring."""
+from typing import Iterable, List
+from bson import ObjectId
+import app.db.db as db
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# exam_id (str) -> AnswerKey
+_answer_keys = TTLCache(maxsize=settings.ANSWER_KEY_CACHE_SIZE, ttl=settings.ANSWER_KEY_CACHE_TTL_SECONDS)
+
+
+def _db():
+    """Always return the current live database object."""
+    if db.database is None:
+        raise RuntimeError("Database not connected")
+    return db.database
+
+
+def normalize_answer(value) -> str:
+    """Answers compare case-insensitively, ignoring surrounding whitespace."""
+    if not value:
+        return ""
+    return str(value).strip().lower()
+
+
+class AnswerKey:
+    """
+    Compact answer key for one exam.
+    Only questions with a non-empty correct answer can ever be scored as correct,
+    so those are kept as parallel tuples; total still counts every question.
+    mcq_ids holds the multiple-choice questions, whose answers are option keys.
+    """
+    __slots__ = ("exam_id", "question_ids", "answers", "total", "mcq_ids")
+
+    def __init__(self, exam_id, question_ids: tuple, answers: tuple, total: int, mcq_ids: frozenset = frozenset()):
+        self.exam_id = exam_id
+        self.question_ids = question_ids
+        self.answers = answers
+        self.total = total
+        self.mcq_ids = mcq_ids
+
+    def score(self, responses: dict) -> int:
+        """Number of correct answers in a session's responses map."""
+        if not responses:
+            return 0
+        get = responses.get
+        return sum(
+            1 for q_id, answer in zip(self.question_ids, self.answers)
+            if normalize_answer(get(q_id)) == answer
+        )
+
+    def score_many(self, responses_list: Iterable[dict]) -> List[int]:
+        """Score many sessions against this key in one call."""
+        return [self.score(responses) for responses in responses_list]
+
+    def percentage(self, score: int) -> float:
+        return (score / self.total * 100) if self.total > 0 else 0
+
+
+def compile_answer_key(exam_id, questions: Iterable[dict]) -> AnswerKey:
+    """Build an AnswerKey from question documents."""
+    question_ids = []
+    answers = []
+    mcq_ids = set()
+    total = 0
+    for question in questions:
+        total += 1
+        if question.get("type") == "MCQ":
+            mcq_ids.add(str(question["_id"]))
+        answer = normalize_answer(question.get("answer"))
+        if answer:
+            question_ids.append(str(question["_id"]))
+            answers.append(answer)
+    return AnswerKey(exam_id, tuple(question_ids), tuple(answers), total, frozenset(mcq_ids))
+
+
+async def get_answer_key(exam_id) -> AnswerKey:
+    """Return the cached answer key for an exam, compiling it from the questions on a miss."""
+    cache_key = str(exam_id)
+    key = _answer_keys.get(cache_key)
+    if key is None:
+        exam_oid = exam_id if isinstance(exam_id, ObjectId) else ObjectId(exam_id)
+        questions = await _db().questions.find(
+            {"exam_id": exam_oid},
+            {"_id": 1, "answer": 1, "type": 1}
+        ).to_list(length=None)
+        key = compile_answer_key(exam_oid, questions)
+        _answer_keys.set(cache_key, key)
+    return key
+
+
+def invalidate_answer_key(exam_id) -> None:
+    """Drop a compiled answer key after the exam's questions or answers change."""
+    _answer_keys.pop(str(exam_id))
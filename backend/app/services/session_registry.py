@@ -0,0 +1,70 @@
+"""In-memory index of active exam sessions keyed by session_token.
+
+Lets the answer and completion hot paths validate a token, its status and its
+expiry without reading the session document (and its growing responses map).
+"""
+from datetime import datetime
+from typing import Optional
+from app.core.config import settings
+
+# Fields fetched when a session is loaded on a miss; never the responses map
+SESSION_PROJECTION = {"_id": 1, "student_id": 1, "exam_id": 1, "expires_at": 1, "status": 1}
+
+
+class ActiveSession:
+    """Compact record of the session fields needed to validate a request."""
+    __slots__ = ("session_id", "student_id", "exam_id", "expires_at", "status")
+
+    def __init__(self, session_id, student_id, exam_id, expires_at: datetime, status: str = "active"):
+        self.session_id = session_id
+        self.student_id = student_id
+        self.exam_id = exam_id
+        self.expires_at = expires_at
+        self.status = status
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "ActiveSession":
+        return cls(doc["_id"], doc.get("student_id"), doc.get("exam_id"), doc["expires_at"], doc.get("status", "active"))
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.utcnow()) > self.expires_at
+
+
+class SessionRegistry:
+    """Bounded session_token -> ActiveSession table, evicted on completion or expiry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._sessions: dict = {}
+
+    def get(self, session_token: str) -> Optional[ActiveSession]:
+        return self._sessions.get(session_token)
+
+    def add(self, session_token: str, doc: dict) -> ActiveSession:
+        """Index an active session document (or projection of one)."""
+        record = ActiveSession.from_doc(doc)
+        self._sessions[session_token] = record
+        if len(self._sessions) > self.maxsize:
+            self._shrink()
+        return record
+
+    def evict(self, session_token: str) -> None:
+        self._sessions.pop(session_token, None)
+
+    def _shrink(self) -> None:
+        # Abandoned sessions are never completed, so drop the expired ones first
+        now = datetime.utcnow()
+        for token in [t for t, r in self._sessions.items() if r.is_expired(now)]:
+            del self._sessions[token]
+        if len(self._sessions) <= self.maxsize:
+            return
+        # Then drop the oldest entries, with some headroom; they reload on the next miss
+        target = int(self.maxsize * 0.9)
+        while len(self._sessions) > target:
+            del self._sessions[next(iter(self._sessions))]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+session_registry = SessionRegistry(maxsize=settings.ACTIVE_SESSION_TABLE_SIZE)
@@ -2,8 +2,10 @@
 from app.clients.user_client import find_user_by_mobile_phone, create_user
 from app.clients.student_client import create_student
 from app.clients.teacher_client import create_teacher
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async, get_password_hashes_async
+from app.db import db
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
 
 async def create_user_with_role(mobile_phone: str, name: str, surname: str, password: str, role: str, subject: str = None) -> dict:
@@ -41,7 +43,7 @@ async def self_register_user(mobile_phone: str, name: str, surname: str, passwor
     
     if not password:
         raise ValueError("Password is required")
-    update_data["password_hash"] = get_password_hash(password)
+    update_data["password_hash"] = await get_password_hash_async(password)
     
     if subject:
         update_data["subject"] = subject
@@ -84,7 +86,7 @@ async def create_user_full(mobile_phone: str, name: str, surname: str, password:
         raise ValueError("Password is required")
         
     # Hash password
-    password_hash = get_password_hash(password)
+    password_hash = await get_password_hash_async(password)
     
     # Create user document
     user_doc = {
@@ -129,3 +131,89 @@ async def create_user_full(mobile_phone: str, name: str, surname: str, password:
         "subject": subject,
         "is_active": True
     }
+
+
+async def create_users_bulk(entries: list) -> list:
+    """
+    Create many users with their role documents in a few round trips.
+    Each entry has the create_user_full arguments. Returns one result per entry,
+    in order: {"user": {...}} on success or {"error": "..."}.
+    """
+    if db.database is None:
+        raise ValueError("Database not initialized")
+    results = [None] * len(entries)
+
+    # Duplicate check: one query for the whole batch, plus repeats inside the batch
+    phones = [entry["mobile_phone"] for entry in entries]
+    existing = {
+        user["mobile_phone"]
+        async for user in db.database.users.find({"mobile_phone": {"$in": phones}}, {"mobile_phone": 1})
+    }
+    seen = set()
+    pending = []
+    for i, entry in enumerate(entries):
+        phone = entry["mobile_phone"]
+        if phone in existing or phone in seen:
+            results[i] = {"error": "Mobile phone number already registered"}
+        elif not entry.get("password"):
+            results[i] = {"error": "Password is required"}
+        else:
+            seen.add(phone)
+            pending.append(i)
+
+    hashes = await get_password_hashes_async([entries[i]["password"] for i in pending])
+
+    user_docs = []
+    for i, password_hash in zip(pending, hashes):
+        entry = entries[i]
+        user_docs.append({
+            "_id": ObjectId(),
+            "mobile_phone": entry["mobile_phone"],
+            "name": entry["name"],
+            "surname": entry["surname"],
+            "password_hash": password_hash,
+            "is_active": True,
+            "role": entry["role"],
+            "subject": entry.get("subject")
+        })
+
+    failed = {}
+    if user_docs:
+        try:
+            await db.database.users.insert_many(user_docs, ordered=False)
+        except BulkWriteError as exc:
+            # e.g. a phone registered concurrently; the rest of the batch is still inserted
+            for error in exc.details.get("writeErrors", []):
+                failed[error["index"]] = error.get("errmsg", "Failed to create user")
+
+    student_docs = []
+    teacher_docs = []
+    for position, (i, user_doc) in enumerate(zip(pending, user_docs)):
+        if position in failed:
+            message = "Mobile phone number already registered" if "duplicate" in failed[position].lower() else failed[position]
+            results[i] = {"error": message}
+            continue
+        role = user_doc["role"]
+        if role == "student":
+            student_docs.append({"user_id": user_doc["_id"], "exam_history": []})
+        elif role == "teacher":
+            teacher_docs.append({"user_id": user_doc["_id"], "exams": [], "subject": user_doc["subject"]})
+        results[i] = {"user": {
+            "id": str(user_doc["_id"]),
+            "mobile_phone": user_doc["mobile_phone"],
+            "mobilePhone": user_doc["mobile_phone"],
+            "name": user_doc["name"],
+            "surname": user_doc["surname"],
+            "firstName": user_doc["name"],
+            "lastName": user_doc["surname"],
+            "role": role,
+            "subject": user_doc["subject"],
+            "is_active": True
+        }}
+
+    # Admin doesn't need a separate document
+    if student_docs:
+        await db.database.students.insert_many(student_docs, ordered=False)
+    if teacher_docs:
+        await db.database.teachers.insert_many(teacher_docs, ordered=False)
+    return results
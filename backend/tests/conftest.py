@@ -0,0 +1,19 @@
+import asyncio
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+import app.db.db as db
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run
+
+
+@pytest.fixture
+def database():
+    """An empty in-memory database installed as the live connection."""
+    previous = db.database
+    db.database = AsyncMongoMockClient()["test"]
+    yield db.database
+    db.database = previous
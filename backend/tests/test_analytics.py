@@ -0,0 +1,108 @@
+import statistics
+from bson import ObjectId
+import pytest
+from app.services import analytics_service
+from app.services.scoring import get_answer_key, invalidate_answer_key
+
+# (responses per question 1..4) for each session; answers are a, b, c, d
+SESSIONS = [
+    "abcd", "abcx", "abxx", "axxx", "xxxx",
+    "abcd", "ab d", "a cd", "bbbb", "abca",
+]
+
+
+async def _exam(database):
+    exam_id = ObjectId()
+    await database.exams.insert_one({"_id": exam_id, "title": "Exam"})
+    questions = [
+        {"_id": ObjectId(), "exam_id": exam_id, "number": n + 1, "type": "MCQ", "answer": "abcd"[n]}
+        for n in range(4)
+    ]
+    questions.append({"_id": ObjectId(), "exam_id": exam_id, "number": 5, "type": "Open-ended", "answer": None})
+    await database.questions.insert_many(questions)
+    invalidate_answer_key(exam_id)
+    return exam_id, [str(q["_id"]) for q in questions]
+
+
+async def _complete(database, exam_id, question_ids, answers):
+    session_id = ObjectId()
+    responses = {q: a for q, a in zip(question_ids, answers) if a.strip()}
+    await database.exam_sessions.insert_one({
+        "_id": session_id, "exam_id": exam_id, "status": "completed", "responses": responses,
+    })
+    return session_id, responses
+
+
+def test_statistics_match_a_direct_computation(database, run):
+    async def scenario():
+        exam_id, question_ids = await _exam(database)
+        for answers in SESSIONS:
+            await _complete(database, exam_id, question_ids, answers)
+        return exam_id, question_ids, await analytics_service.get_exam_analytics(str(exam_id))
+
+    exam_id, question_ids, stats = run(scenario())
+    scores = [sum(1 for given, correct in zip(answers, "abcd") if given == correct) for answers in SESSIONS]
+
+    assert stats["sessions"] == len(SESSIONS)
+    assert stats["total_questions"] == 5
+    assert stats["mean"] == pytest.approx(statistics.mean(scores))
+    assert stats["median"] == statistics.median(scores)
+    assert stats["std_dev"] == pytest.approx(statistics.pstdev(scores), abs=1e-4)
+    assert (stats["min"], stats["max"]) == (min(scores), max(scores))
+    quartiles = statistics.quantiles(scores, n=4, method="inclusive")
+    assert [stats["percentiles"][p] for p in ("p25", "p50", "p75")] == pytest.approx(quartiles)
+    assert sum(bucket["count"] for bucket in stats["histogram"]) == len(SESSIONS)
+
+    first = stats["questions"][0]
+    correct = [answers[0] == "a" for answers in SESSIONS]
+    assert first["correct_rate"] == sum(correct) / len(SESSIONS)
+    assert first["option_distribution"] == {"a": 8, "b": 1, "x": 1}
+    assert first["answered"] == 10
+    expected = statistics.correlation([float(c) for c in correct], [float(s) for s in scores])
+    assert first["discrimination"] == pytest.approx(expected, abs=1e-4)
+
+    open_ended = stats["questions"][4]
+    assert open_ended["correct_rate"] is None and open_ended["option_distribution"] is None
+
+
+def test_incremental_updates_equal_a_rebuild(database, run):
+    async def scenario():
+        exam_id, question_ids = await _exam(database)
+        for answers in SESSIONS[:5]:
+            await _complete(database, exam_id, question_ids, answers)
+        await analytics_service.get_exam_analytics(str(exam_id))  # builds the document
+
+        key = await get_answer_key(exam_id)
+        for answers in SESSIONS[5:]:
+            session_id, responses = await _complete(database, exam_id, question_ids, answers)
+            await analytics_service.record_completion(session_id, key.score(responses))
+        incremental = await analytics_service.get_exam_analytics(str(exam_id))
+
+        await analytics_service.rebuild_exam_analytics(exam_id)
+        rebuilt = await analytics_service.get_exam_analytics(str(exam_id))
+        return incremental, rebuilt
+
+    incremental, rebuilt = run(scenario())
+    incremental.pop("updated_at")
+    rebuilt.pop("updated_at")
+    assert incremental == rebuilt
+    assert incremental["sessions"] == len(SESSIONS)
+
+
+def test_a_session_is_counted_once(database, run):
+    async def scenario():
+        exam_id, question_ids = await _exam(database)
+        session_id, responses = await _complete(database, exam_id, question_ids, "abcd")
+        # A read rebuilds between the status change and record_completion
+        await analytics_service.get_exam_analytics(str(exam_id))
+        await analytics_service.record_completion(session_id, 4)
+        await analytics_service.record_completion(session_id, 4)
+        stored = await database.exam_analytics.find_one({"_id": exam_id})
+        return await analytics_service.get_exam_analytics(str(exam_id)), stored
+
+    stats, stored = run(scenario())
+    # The document stays the same size however many students complete the exam
+    assert "sessions" not in stored
+    assert stats["sessions"] == 1
+    assert stats["mean"] == 4
+    assert stats["questions"][0]["answered"] == 1
@@ -0,0 +1,117 @@
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.services import answer_buffer as buffer_module
+from app.services.answer_buffer import AnswerBuffer, _rotated_journals
+
+
+def _journal_files(journal):
+    return _rotated_journals(journal) + ([journal] if os.path.exists(journal) else [])
+
+
+async def _active_session(database):
+    session_id = ObjectId()
+    await database.exam_sessions.insert_one({
+        "_id": session_id,
+        "status": "active",
+        "expires_at": datetime.utcnow() + timedelta(hours=1),
+        "responses": {},
+    })
+    return session_id
+
+
+async def _responses(database, session_id):
+    return (await database.exam_sessions.find_one({"_id": session_id}))["responses"]
+
+
+def test_answers_journaled_before_a_crash_are_replayed(database, run, tmp_path):
+    journal = str(tmp_path / "answers.jsonl")
+
+    async def scenario():
+        session_id = await _active_session(database)
+        crashed = AnswerBuffer(journal, flush_interval=60)
+        crashed.record(session_id, "q1", "a")
+        crashed.record(session_id, "q1", "b")
+        crashed.record(session_id, "q2", "c")
+        crashed._close_journal()  # process dies without flushing
+
+        restarted = AnswerBuffer(journal, flush_interval=60)
+        assert await restarted.flush() == 1
+        assert await _responses(database, session_id) == {"q1": "b", "q2": "c"}
+        assert _journal_files(journal) == []
+
+    run(scenario())
+
+
+def test_failed_replay_keeps_the_journal(database, run, tmp_path, monkeypatch):
+    journal = str(tmp_path / "answers.jsonl")
+
+    async def scenario():
+        session_id = await _active_session(database)
+        crashed = AnswerBuffer(journal, flush_interval=60)
+        crashed.record(session_id, "q1", "a")
+        crashed._close_journal()
+
+        restarted = AnswerBuffer(journal, flush_interval=60)
+
+        async def unavailable(batch):
+            raise RuntimeError("Database not connected")
+
+        original = buffer_module._write_batch
+        monkeypatch.setattr(buffer_module, "_write_batch", unavailable)
+        for _ in range(3):
+            try:
+                await restarted.flush()
+            except RuntimeError:
+                pass
+        assert _journal_files(journal)
+
+        monkeypatch.setattr(buffer_module, "_write_batch", original)
+        await restarted.flush()
+        assert await _responses(database, session_id) == {"q1": "a"}
+        assert _journal_files(journal) == []
+
+    run(scenario())
+
+
+def test_answers_recorded_during_a_flush_stay_journaled(database, run, tmp_path, monkeypatch):
+    journal = str(tmp_path / "answers.jsonl")
+
+    async def scenario():
+        session_id = await _active_session(database)
+        buffer = AnswerBuffer(journal, flush_interval=60)
+        buffer.record(session_id, "q1", "a")
+        original = buffer_module._write_batch
+
+        async def write_while_answering(batch):
+            buffer.record(session_id, "q2", "late")
+            await original(batch)
+
+        monkeypatch.setattr(buffer_module, "_write_batch", write_while_answering)
+        await buffer.flush()
+        buffer._close_journal()  # crash before the next flush
+
+        assert _journal_files(journal) == [journal]
+        monkeypatch.setattr(buffer_module, "_write_batch", original)
+        await AnswerBuffer(journal, flush_interval=60).flush()
+        assert await _responses(database, session_id) == {"q1": "a", "q2": "late"}
+
+    run(scenario())
+
+
+def test_flush_session_replays_previous_answers_first(database, run, tmp_path):
+    journal = str(tmp_path / "answers.jsonl")
+
+    async def scenario():
+        session_id = await _active_session(database)
+        crashed = AnswerBuffer(journal, flush_interval=60)
+        crashed.record(session_id, "q1", "before crash")
+        crashed._close_journal()
+
+        restarted = AnswerBuffer(journal, flush_interval=60)
+        restarted.record(session_id, "q2", "after restart")
+        await restarted.flush_session(session_id)
+        assert await _responses(database, session_id) == {"q1": "before crash", "q2": "after restart"}
+        assert restarted.pending_for(session_id) == {}
+
+    run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import app.db.db as db
+
+
+@pytest.fixture
+def mock_startup(monkeypatch, tmp_path):
+    """Point the mock database at empty files and reset the readiness state."""
+    monkeypatch.setattr(db, "MOCK_DB_FILE", str(tmp_path / "mock_db.pkl"))
+    monkeypatch.setattr(db, "MOCK_DB_OPLOG_FILE", str(tmp_path / "mock_db.oplog"))
+    monkeypatch.setattr(db, "database", None)
+    monkeypatch.setattr(db, "db_status", "restoring")
+    monkeypatch.setattr(db, "_ready", asyncio.Event())
+    monkeypatch.setattr(db, "_journal_task", None)
+    monkeypatch.setattr(db, "_restore_task", None)
+
+
+def test_failed_seed_still_marks_the_mock_database_ready(mock_startup, monkeypatch, run):
+    async def broken_seed(database):
+        raise RuntimeError("seed failed")
+
+    monkeypatch.setattr(db, "seed_admin_user", broken_seed)
+
+    async def scenario():
+        await db._restore_mock_database()
+        assert db.db_status == "ready"
+        await asyncio.wait_for(db.wait_until_ready(), 1)
+        assert db._journal_task is not None and not db._journal_task.done()
+        await db.save_mock_db()
+        assert db._journal_task.cancelled()
+
+    run(scenario())
+
+
+def test_failed_restore_reports_failed(mock_startup, monkeypatch, run):
+    def broken_journal(*args, **kwargs):
+        raise OSError("disk unavailable")
+
+    monkeypatch.setattr(db, "MockJournal", broken_journal)
+    run(db._restore_mock_database())
+    assert db.db_status == "failed"
+    assert not db._ready.is_set()
+
+
+def test_unreadable_snapshot_fails_without_overwriting_it(mock_startup, monkeypatch, run):
+    with open(db.MOCK_DB_FILE, "wb") as f:
+        f.write(b"not a snapshot")
+
+    async def scenario():
+        await db._restore_mock_database()
+        assert db.db_status == "failed"
+        assert db.database is None and not db._ready.is_set()
+        await db.save_mock_db()
+
+    run(scenario())
+    with open(db.MOCK_DB_FILE, "rb") as f:
+        assert f.read() == b"not a snapshot"
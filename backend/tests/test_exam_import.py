@@ -0,0 +1,50 @@
+import io
+import pytest
+from bson import ObjectId
+import app.db.db as db
+from app.services import exam_import
+
+CSV_UPLOAD = (
+    "exam_title,exam_subject,number,statement,type,answer,option_a,option_b\n"
+    "Algebra,Math,1,\"Two\nlines\",MCQ,A,x,y\n"
+    "Algebra,Math,2,Second,MCQ,b,x,y\n"
+    "Algebra,Math,2,Duplicate number,MCQ,a,x,y\n"
+    "Biology,Science,1,Cells,Unknown,a,x,y\n"
+    "Biology,Science,2,Explain,Open-ended,,,\n"
+)
+
+
+def test_csv_import_creates_exams_and_reports_bad_rows(database, run, monkeypatch):
+    # Several trips to the worker thread, including one that splits an exam
+    monkeypatch.setattr(exam_import, "PARSE_BATCH_SIZE", 2)
+    creator_id = ObjectId()
+
+    async def scenario():
+        await db.create_indexes()
+        rows = exam_import.aiter_rows(io.BytesIO(CSV_UPLOAD.encode()), "csv")
+        return await exam_import.import_exams(rows, creator_id)
+
+    result = run(scenario())
+    assert [(e["title"], e["questions"]) for e in result["exams"]] == [("Algebra", 2), ("Biology", 1)]
+    assert result["questions_imported"] == 3
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+
+    async def stored():
+        exam = await database.exams.find_one({"title": "Algebra"})
+        questions = await database.questions.find({"exam_id": exam["_id"]}).sort("number", 1).to_list(None)
+        return exam, questions
+
+    exam, questions = run(stored())
+    assert exam["creator_id"] == creator_id and exam["questions_count"] == 2
+    assert [q["statement"] for q in questions] == ["Two\nlines", "Second"]
+    assert questions[0]["answer"] == "a"
+
+
+def test_invalid_json_line_is_rejected(database, run):
+    async def scenario():
+        rows = exam_import.aiter_rows(io.BytesIO(b'{"exam_title": "A", "statement": "q"}\nnot json\n'), "jsonl")
+        return await exam_import.import_exams(rows, ObjectId())
+
+    with pytest.raises(ValueError, match="Line 2"):
+        run(scenario())
+    assert run(database.questions.count_documents({})) == 0
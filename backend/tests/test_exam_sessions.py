@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.services import exam_service
+from app.services.session_registry import session_registry
+
+
+async def _session(database, status="active", expires_in=timedelta(hours=1)):
+    student_id = ObjectId()
+    exam_id = ObjectId()
+    await database.users.insert_one({"_id": student_id, "mobile_phone": f"+{uuid.uuid4().int % 10**10}"})
+    await database.exams.insert_one({"_id": exam_id, "title": "Exam", "duration_minutes": 60, "questions": []})
+    session = {
+        "_id": ObjectId(),
+        "student_id": student_id,
+        "exam_id": exam_id,
+        "session_token": str(uuid.uuid4()),
+        "started_at": datetime.utcnow(),
+        "expires_at": datetime.utcnow() + expires_in,
+        "status": status,
+        "responses": {},
+    }
+    await database.exam_sessions.insert_one(session)
+    return session
+
+
+def test_resuming_an_expired_session_does_not_reactivate_it(database, run):
+    async def scenario():
+        session = await _session(database, status="expired")
+        resumed = await exam_service.start_exam_session(str(session["student_id"]), str(session["exam_id"]))
+        assert resumed["status"] == "expired"
+        assert session_registry.get(session["session_token"]) is None
+
+        with pytest.raises(ValueError):
+            await exam_service.submit_question_answer(session["session_token"], "q1", "a")
+        with pytest.raises(ValueError):
+            await exam_service.complete_exam_session(session["session_token"])
+        assert await database.reports.count_documents({}) == 0
+
+    run(scenario())
+
+
+def test_registry_record_of_an_expired_session_is_rejected(database, run):
+    async def scenario():
+        session = await _session(database, status="expired")
+        session_registry.add(session["session_token"], session)
+        try:
+            with pytest.raises(ValueError):
+                await exam_service.submit_question_answer(session["session_token"], "q1", "a")
+        finally:
+            session_registry.evict(session["session_token"])
+
+    run(scenario())
+
+
+def test_session_past_its_deadline_expires_on_the_next_answer(database, run):
+    async def scenario():
+        session = await _session(database, expires_in=timedelta(seconds=-1))
+        with pytest.raises(ValueError, match="expired"):
+            await exam_service.submit_question_answer(session["session_token"], "q1", "a")
+        stored = await database.exam_sessions.find_one({"_id": session["_id"]})
+        assert stored["status"] == "expired"
+
+        with pytest.raises(ValueError):
+            await exam_service.complete_exam_session(session["session_token"])
+        assert await database.reports.count_documents({}) == 0
+
+    run(scenario())
@@ -0,0 +1,29 @@
+import json
+import logging
+import app.core.log as log
+from app.core.config import settings
+
+
+def test_exceptions_reach_the_json_output(monkeypatch, capsys):
+    app_logger = logging.getLogger("app")
+    monkeypatch.setattr(app_logger, "handlers", [])
+    monkeypatch.setattr(app_logger, "level", app_logger.level)
+    monkeypatch.setattr(app_logger, "propagate", app_logger.propagate)
+    monkeypatch.setattr(log, "_listener", None)
+    monkeypatch.setattr(settings, "LOG_FORMAT", "json")
+
+    log.setup_logging()
+    try:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            log.get_logger("app.test").exception("Failed for %s", "session-1", extra={"request_id": "r1"})
+    finally:
+        log.shutdown_logging()
+
+    entry = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert entry["msg"] == "Failed for session-1"
+    assert entry["request_id"] == "r1"
+    assert "RuntimeError: boom" in entry["exc"]
+    # The traceback is reported once, not folded into the message
+    assert "Traceback" not in entry["msg"]
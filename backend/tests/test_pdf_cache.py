@@ -0,0 +1,41 @@
+import os
+import pytest
+from app.core.config import settings
+from app.services import pdf_service
+
+
+@pytest.fixture
+def pdf_cache(tmp_path, monkeypatch):
+    """An empty cache directory with room for two 100-byte PDFs, rendered without the worker pool."""
+    monkeypatch.setattr(pdf_service, "PDF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_service, "_cache_index", None)
+    monkeypatch.setattr(pdf_service, "_cache_bytes", 0)
+    monkeypatch.setattr(pdf_service, "_in_use", {})
+    monkeypatch.setattr(settings, "PDF_CACHE_MAX_BYTES", 200)
+
+    async def render_pdf(data):
+        return b"%" * 100
+
+    monkeypatch.setattr(pdf_service, "render_pdf", render_pdf)
+    return tmp_path
+
+
+async def _load_data():
+    return {}
+
+
+def test_a_pdf_being_sent_is_not_evicted(pdf_cache, run):
+    async def scenario():
+        sent = await pdf_service.cached_report_pdf("a", {"version": 1}, _load_data)
+        for session_id in ("b", "c"):
+            pdf_service.release_pdf(await pdf_service.cached_report_pdf(session_id, {"version": 1}, _load_data))
+        kept = os.path.exists(sent)
+
+        pdf_service.release_pdf(sent)
+        await pdf_service.cached_report_pdf("d", {"version": 1}, _load_data)
+        return kept, os.path.exists(sent)
+
+    kept, kept_after_release = run(scenario())
+    assert kept
+    assert not kept_after_release
+    assert sorted(os.listdir(pdf_cache)) == ["c-v1.pdf", "d-v1.pdf"]
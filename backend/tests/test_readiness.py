@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+import app.db.db as db
+from app.core.readiness import ReadinessMiddleware
+
+
+async def _call(path: str):
+    messages = []
+    reached = []
+
+    async def inner(scope, receive, send):
+        reached.append(scope["path"])
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    await ReadinessMiddleware(inner)(scope, None, send)
+    status = messages[0]["status"] if messages else None
+    return status, bool(reached)
+
+
+@pytest.fixture
+def not_ready(monkeypatch):
+    monkeypatch.setattr(db, "_ready", asyncio.Event())
+
+
+def test_routes_answer_503_until_the_database_is_ready(not_ready, run):
+    assert run(_call("/api/exams")) == (503, False)
+    assert run(_call("/health")) == (None, True)
+    assert run(_call("/metrics")) == (None, True)
+
+    db._ready.set()
+    assert run(_call("/api/exams")) == (None, True)
@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import app.db.db as db
+from app.services import report_service
+
+
+async def _scored_session(database):
+    exam_id = ObjectId()
+    question_id = ObjectId()
+    await database.questions.insert_one({"_id": question_id, "exam_id": exam_id, "number": 1, "type": "MCQ", "answer": "a"})
+    session = {
+        "_id": ObjectId(), "session_token": str(uuid.uuid4()), "student_id": ObjectId(),
+        "exam_id": exam_id, "status": "completed", "responses": {str(question_id): "a"},
+    }
+    await database.exam_sessions.insert_one(session)
+    return session
+
+
+def test_concurrent_scoring_keeps_one_report(database, run):
+    async def scenario():
+        await db.create_indexes()
+        session = await _scored_session(database)
+        await asyncio.gather(*(report_service.calculate_score(str(session["_id"])) for _ in range(5)))
+        return await database.reports.find({"session_id": session["_id"]}).to_list(None)
+
+    reports = run(scenario())
+    assert len(reports) == 1
+    assert reports[0]["score"] == 1 and reports[0]["version"] == 5
+
+
+def test_scoring_retries_when_a_concurrent_upsert_wins(database, run, monkeypatch):
+    collection_type = type(database.reports)
+    original = collection_type.find_one_and_update
+    calls = []
+
+    async def racing_upsert(self, *args, **kwargs):
+        calls.append(kwargs.get("upsert", False))
+        if len(calls) == 1:
+            # Another request inserts the report between our match and our insert
+            await original(self, *args, **kwargs)
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "find_one_and_update", racing_upsert)
+
+    async def scenario():
+        await db.create_indexes()
+        session = await _scored_session(database)
+        report = await report_service.calculate_score(str(session["_id"]))
+        return report, await database.reports.count_documents({})
+
+    report, count = run(scenario())
+    assert calls == [True, False]
+    assert count == 1 and report["version"] == 2
+
+
+def test_duplicate_reports_are_removed_before_the_unique_index(database, run):
+    async def scenario():
+        session_id = ObjectId()
+        now = datetime.utcnow()
+        await database.reports.create_index("session_id")
+        await database.reports.insert_many([
+            {"session_id": session_id, "score": 0, "updated_at": now - timedelta(days=1)},
+            {"session_id": session_id, "score": 1, "updated_at": now},
+            {"session_id": ObjectId(), "score": 2, "updated_at": now},
+        ])
+        await db.create_indexes()
+        reports = await database.reports.find({"session_id": session_id}).to_list(None)
+        return reports, await database.reports.index_information()
+
+    reports, indexes = run(scenario())
+    assert [report["score"] for report in reports] == [1]
+    assert indexes["session_id_1"]["unique"] is True
+
+
+def test_duplicate_reports_without_any_index_are_removed(database, run):
+    async def scenario():
+        session_id = ObjectId()
+        now = datetime.utcnow()
+        await database.reports.insert_many([
+            {"session_id": session_id, "score": 1, "updated_at": now},
+            {"session_id": session_id, "score": 0, "updated_at": now - timedelta(days=1)},
+        ])
+        await db.create_indexes()
+        reports = await database.reports.find({"session_id": session_id}).to_list(None)
+        return reports, await database.reports.index_information()
+
+    reports, indexes = run(scenario())
+    assert [report["score"] for report in reports] == [1]
+    assert indexes["session_id_1"]["unique"] is True
+
+
+def test_report_lookup_by_token_or_id_is_cached_until_rescored(database, run):
+    async def scenario():
+        session = await _scored_session(database)
+        by_token = await report_service.get_session_report(session["session_token"])
+        by_id = await report_service.get_session_report(str(session["_id"]))
+        cached = await report_service.get_session_report(session["session_token"])
+        await report_service.calculate_score(str(session["_id"]))
+        refreshed = await report_service.get_session_report(session["session_token"])
+        return by_token, by_id, cached, refreshed
+
+    by_token, by_id, cached, refreshed = run(scenario())
+    assert by_token["_id"] == by_id["_id"]
+    assert cached is by_id
+    assert refreshed is not cached and refreshed["version"] == 2
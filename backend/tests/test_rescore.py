@@ -0,0 +1,34 @@
+import asyncio
+from bson import ObjectId
+from app.services import rescore_service
+
+
+def test_concurrent_starts_share_one_job(database, run, monkeypatch):
+    collection_type = type(database.exam_sessions)
+    count_documents = collection_type.count_documents
+
+    async def slow_count(self, *args, **kwargs):
+        # A real driver yields to the event loop while the query runs
+        await asyncio.sleep(0.01)
+        return await count_documents(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "count_documents", slow_count)
+
+    async def scenario():
+        exam_id = ObjectId()
+        await database.exams.insert_one({"_id": exam_id, "title": "Exam"})
+        await database.questions.insert_one({"_id": ObjectId(), "exam_id": exam_id, "number": 1, "type": "MCQ", "answer": "a"})
+        await database.exam_sessions.insert_many([
+            {"_id": ObjectId(), "exam_id": exam_id, "status": "completed", "responses": {}} for _ in range(3)
+        ])
+        first, second = await asyncio.gather(
+            rescore_service.start_rescore_job(str(exam_id)),
+            rescore_service.start_rescore_job(str(exam_id)),
+        )
+        await asyncio.gather(*list(rescore_service._tasks.values()))
+        return first, second, rescore_service.get_rescore_job(first["id"])
+
+    first, second, finished = run(scenario())
+    assert first["id"] == second["id"]
+    assert finished["status"] == "completed"
+    assert finished["total"] == finished["processed"] == 3
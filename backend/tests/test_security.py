@@ -0,0 +1,28 @@
+import pytest
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import render_metrics
+
+
+def _sample(name: str) -> float:
+    for line in render_metrics().splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_password_jobs_are_timed(run):
+    before = _sample('password_hash_duration_seconds_count{operation="hash"}')
+    hashed = run(security.get_password_hash_async("secret"))
+    assert run(security.verify_password_async("secret", hashed))
+    assert _sample('password_hash_duration_seconds_count{operation="hash"}') == before + 1
+    assert _sample('password_hash_duration_seconds_count{operation="verify"}') >= 1
+    assert _sample("password_hash_pending") == 0
+
+
+def test_password_jobs_over_the_limit_are_rejected_and_counted(run, monkeypatch):
+    before = _sample("password_hash_rejected_total")
+    monkeypatch.setattr(security, "_password_pending", settings.PASSWORD_HASH_MAX_PENDING)
+    with pytest.raises(security.PasswordHashingBusy):
+        run(security.get_password_hash_async("secret"))
+    assert _sample("password_hash_rejected_total") == before + 1
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.services.session_registry import SessionRegistry
+
+
+def _doc(expires_in=timedelta(hours=1)):
+    return {"_id": ObjectId(), "student_id": ObjectId(), "exam_id": ObjectId(),
+            "expires_at": datetime.utcnow() + expires_in, "status": "active"}
+
+
+def test_records_are_indexed_by_token_and_evicted():
+    registry = SessionRegistry(maxsize=10)
+    doc = _doc()
+    record = registry.add("token", doc)
+    assert registry.get("token") is record
+    assert record.session_id == doc["_id"] and record.status == "active"
+    assert not record.is_expired()
+    registry.evict("token")
+    assert registry.get("token") is None
+
+
+def test_full_table_drops_expired_sessions_first():
+    registry = SessionRegistry(maxsize=4)
+    registry.add("expired", _doc(timedelta(seconds=-1)))
+    for i in range(3):
+        registry.add(f"live{i}", _doc())
+    registry.add("newest", _doc())
+    assert registry.get("expired") is None
+    assert all(registry.get(f"live{i}") for i in range(3))
+    assert registry.get("newest") is not None
+
+
+def test_full_table_of_live_sessions_drops_the_oldest():
+    registry = SessionRegistry(maxsize=10)
+    for i in range(11):
+        registry.add(f"t{i}", _doc())
+    assert len(registry) == 9
+    assert registry.get("t0") is None and registry.get("t1") is None
+    assert registry.get("t10") is not None
@@ -0,0 +1,42 @@
+from bson import ObjectId
+from app.clients.user_client import find_users_by_role
+
+
+async def _seed(database):
+    users = [
+        {"_id": ObjectId(), "role": "student", "name": f"Name{i:02d}", "surname": "Doe", "mobile_phone": f"+9955{i:04d}"}
+        for i in range(25)
+    ]
+    users.append({"_id": ObjectId(), "role": "student", "name": "alice", "surname": "Smith", "mobile_phone": "+1000"})
+    users.append({"_id": ObjectId(), "role": "teacher", "name": "Teacher", "surname": "T", "mobile_phone": "+2000"})
+    await database.users.insert_many(users)
+
+
+def test_keyset_pages_cover_every_user_once(database, run):
+    async def scenario():
+        await _seed(database)
+        seen, after = [], None
+        while True:
+            page = await find_users_by_role("student", {"_id": 1}, after=after, limit=10).to_list(None)
+            if not page:
+                return seen
+            seen.extend(user["_id"] for user in page)
+            after = page[-1]["_id"]
+
+    seen = run(scenario())
+    assert len(seen) == 26
+    assert seen == sorted(seen)
+
+
+def test_search_matches_name_surname_and_phone_prefixes(database, run):
+    async def names(search):
+        cursor = find_users_by_role("student", {"name": 1}, search=search)
+        return sorted(user["name"] for user in await cursor.to_list(None))
+
+    run(_seed(database))
+    assert run(names("alice")) == ["alice"]
+    assert run(names("Smi")) == ["alice"]
+    assert run(names("smi")) == ["alice"]
+    assert run(names("1000")) == ["alice"]
+    assert run(names("Name0")) == [f"Name0{i}" for i in range(10)]
+    assert run(names("Teacher")) == []